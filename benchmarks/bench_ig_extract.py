@@ -0,0 +1,116 @@
+"""Instagram post page parsing: BeautifulSoup (original carousel parse) vs streaming extractor.
+
+Runs on the saved pages in benchmarks/fixtures. The streaming side is
+fed in 16 KiB chunks, the way httpx hands the response over, and stops
+where scrape_post would close the connection. No network access is
+needed.
+
+    python -m benchmarks.bench_ig_extract [iterations]
+"""
+import json
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from bot.downloaders.ig_extract import extract_page
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+PAGES = ("instagram_carousel.html", "instagram_single.html")
+
+
+def soup_extract(html_content: str) -> dict:
+    """The BeautifulSoup parsing of the original download_carousel, unchanged.
+
+    It never read the caption and deduplicated through a set, so only the
+    author and the set of media URLs are comparable with the streaming side
+    (which does the extra work of parsing the caption and keeping slide order).
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+    image_urls = []
+    username = None
+
+    for meta in soup.find_all('meta', property='og:title'):
+        if meta.get('content'):
+            content = meta.get('content')
+            if ' on Instagram' in content:
+                username = content.split(' on Instagram')[0].strip()
+                break
+
+    for script in soup.find_all('script', type='application/ld+json'):
+        script_content = script.string if hasattr(script, 'string') else None
+        if script_content:
+            try:
+                data = json.loads(script_content)
+                if isinstance(data, dict) and 'image' in data:
+                    if isinstance(data['image'], list):
+                        for img in data['image']:
+                            if isinstance(img, str):
+                                image_urls.append(img)
+                            elif isinstance(img, dict) and 'url' in img:
+                                image_urls.append(img['url'])
+                    elif isinstance(data['image'], str):
+                        image_urls.append(data['image'])
+
+                    if not username and 'author' in data and 'name' in data['author']:
+                        username = data['author']['name']
+            except Exception:
+                pass
+
+    carousel_patterns = [
+        r'"display_url":"(https:\\\/\\\/[^"]+)"',
+        r'"display_resources":\[.*?"src":"(https:\\\/\\\/[^"]+)"',
+    ]
+    for script in soup.find_all('script'):
+        script_content = script.string if hasattr(script, 'string') else None
+        if script_content and 'carousel_media' in script_content:
+            for pattern in carousel_patterns:
+                for match in re.findall(pattern, script_content):
+                    clean_url = match.replace('\\u0026', '&').replace('\\/', '/')
+                    if clean_url not in image_urls:
+                        image_urls.append(clean_url)
+
+    image_urls = list(set(image_urls))
+    media = [u.replace('\\', '') for u in image_urls if u.replace('\\', '').startswith('http')]
+    return {"author": username, "media": media}
+
+
+def stream_extract(html_content: str) -> dict:
+    extractor = extract_page(html_content)
+    return {
+        "author": extractor.author,
+        "caption": extractor.caption or "",
+        "media": extractor.media_urls(),
+        "chars_read": extractor.chars_read,
+    }
+
+
+def bench(fn, page: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(page)
+    return (time.perf_counter() - start) / iterations
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for name in PAGES:
+        with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+            page = f.read()
+
+        old = soup_extract(page)
+        new = stream_extract(page)
+        same = old["author"] == new["author"] and set(old["media"]) == set(new["media"])
+
+        soup_t = bench(soup_extract, page, iterations)
+        stream_t = bench(stream_extract, page, iterations)
+        print(f"{name}  ({len(page) / 1024:.0f} KiB, {len(new['media'])} media, same author and media: {same})")
+        print(f"  BeautifulSoup:  {soup_t * 1000:8.2f} ms/page, reads {len(page) / 1024:6.0f} KiB")
+        print(f"  streaming:      {stream_t * 1000:8.2f} ms/page, reads {new['chars_read'] / 1024:6.0f} KiB")
+        print(f"  speedup:        {soup_t / stream_t:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
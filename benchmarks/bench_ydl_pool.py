@@ -0,0 +1,72 @@
+"""Per-request YoutubeDL setup cost: fresh instance vs warm YDLPool checkout.
+
+No network access is needed; each "request" performs the setup a real job
+pays before its first HTTP call (extractor lookup, cookie jar, HTTP
+handlers, output template).
+
+    python -m benchmarks.bench_ydl_pool [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import yt_dlp
+
+from bot.downloaders.ydl_pool import YDLPool
+
+OPTS = {
+    'outtmpl': os.path.join(tempfile.gettempdir(), '%(id)s.%(ext)s'),
+    'format': 'best',
+    'quiet': True,
+    'no_warnings': True,
+    'socket_timeout': 10,
+    'retries': 2,
+}
+INFO = {'id': '7300000000000000000', 'ext': 'mp4', 'title': 'bench'}
+
+
+def _job(ydl: yt_dlp.YoutubeDL) -> None:
+    ydl.get_info_extractor('TikTok')
+    ydl.get_info_extractor('Instagram')
+    _ = ydl.cookiejar
+    _ = ydl._request_director
+    ydl.prepare_filename(INFO)
+
+
+def bench_fresh(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with yt_dlp.YoutubeDL(dict(OPTS)) as ydl:
+            _job(ydl)
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_pool(iterations: int) -> float:
+    pool = YDLPool(OPTS, size=1, max_uses=50, name="bench")
+    pool.warm()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with pool.checkout() as ydl:
+            _job(ydl)
+    elapsed = (time.perf_counter() - start) / iterations
+    pool.close_all()
+    return elapsed
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    # prime imports / lazy extractors so neither side pays one-off costs
+    bench_fresh(3)
+
+    fresh = bench_fresh(iterations)
+    pooled = bench_pool(iterations)
+    print(f"iterations:        {iterations}")
+    print(f"fresh YoutubeDL:   {fresh * 1000:8.3f} ms/request")
+    print(f"YDLPool checkout:  {pooled * 1000:8.3f} ms/request "
+          f"(includes a rebuild every 50 uses)")
+    print(f"speedup:           {fresh / pooled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Admission control: shed new free-tier downloads before the bot overloads"""
+import logging
+import os
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (None where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AdmissionController:
+    """Decides whether a new download may enter the system.
+
+    Load is read from the components that already track it: downloads in
+    flight (coalescer), jobs waiting in the scheduler, temp disk usage
+    (media store) and the process RSS, which pm2 kills at
+    ``max_memory_restart``. Above any threshold, ``shed_tiers`` are
+    refused and ``shed_reason`` names the check; other tiers are always
+    admitted. A value of 0 disables that check. RSS is sampled at most
+    once per ``rss_interval``.
+    """
+
+    def __init__(
+        self,
+        coalescer,
+        scheduler,
+        store,
+        max_in_flight: int = 40,
+        max_queued: int = 20,
+        max_disk_fraction: float = 0.9,
+        max_rss_bytes: int = 400 * 1024 * 1024,
+        shed_tiers: tuple = ("free",),
+        rss_interval: float = 2.0,
+    ):
+        self.coalescer = coalescer
+        self.scheduler = scheduler
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_disk_fraction = max_disk_fraction
+        self.max_rss_bytes = max_rss_bytes
+        self.shed_tiers = shed_tiers
+        self.rss_interval = rss_interval
+        self._rss: Optional[int] = None
+        self._rss_at = 0.0
+        self.admitted = 0
+        self.shed: Counter = Counter()
+
+    def rss(self) -> Optional[int]:
+        now = time.monotonic()
+        if now - self._rss_at >= self.rss_interval:
+            self._rss = current_rss()
+            self._rss_at = now
+        return self._rss
+
+    def overload(self) -> Optional[str]:
+        """Name of the first exceeded threshold, or None"""
+        if self.max_in_flight and self.coalescer.in_flight >= self.max_in_flight:
+            return "in_flight"
+        if self.max_queued and self.scheduler.queued >= self.max_queued:
+            return "queued"
+        if self.max_disk_fraction and self.store.usage >= self.store.max_bytes * self.max_disk_fraction:
+            return "disk"
+        rss = self.rss() if self.max_rss_bytes else None
+        if rss is not None and rss >= self.max_rss_bytes:
+            return "rss"
+        return None
+
+    def shed_reason(self, tier: str) -> Optional[str]:
+        """Why a ``tier`` job is shed right now, or None if it may start"""
+        if tier in self.shed_tiers:
+            reason = self.overload()
+            if reason:
+                self.shed[reason] += 1
+                logger.warning(f"Shedding {tier} download: {reason} over threshold")
+                return reason
+        self.admitted += 1
+        return None
+
+    def stats(self) -> Dict:
+        rss = self.rss()
+        return {
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "shed_total": sum(self.shed.values()),
+            "rss": rss,
+            "overload": self.overload(),
+        }
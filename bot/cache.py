@@ -0,0 +1,114 @@
+"""Small in-process TTL/LRU cache with optional SQLite persistence"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# one writer thread keeps write-through order (set then pop of a key) intact
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-persist")
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    When a ``store`` is given (``Database`` implements ``cache_load`` /
+    ``cache_set`` / ``cache_delete``), entries are written through under
+    ``namespace`` and the newest ``maxsize`` of them are loaded back once at
+    construction, so the cache survives pm2 restarts while lookups never
+    touch SQLite. Writes called from the event loop run on a background
+    writer thread. Values must be JSON serialisable in that case.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 3600,
+        namespace: Optional[str] = None,
+        store=None,
+    ):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.namespace = namespace
+        self.store = store if namespace else None
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        if self.store is not None:
+            self._persist(self.store.cache_set, key, json.dumps(value), expires_at)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+        if self.store is not None:
+            self._persist(self.store.cache_delete, key)
+
+    def _persist(self, write: Callable, *args) -> None:
+        def _write() -> None:
+            try:
+                write(self.namespace, *args)
+            except Exception as e:
+                logger.warning(f"Cache persist failed ({self.namespace}): {e}")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            _write()
+            return
+        loop.run_in_executor(_persist_executor, _write)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _load(self) -> None:
+        if self.store is None:
+            return
+        try:
+            rows = self.store.cache_load(self.namespace, self.maxsize)
+        except Exception as e:
+            logger.warning(f"Cache load failed ({self.namespace}): {e}")
+            return
+        for key, raw, expires_at in rows:
+            self._remember(key, json.loads(raw), expires_at)
+        if rows:
+            logger.info(f"Cache {self.namespace}: loaded {len(rows)} entries")
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
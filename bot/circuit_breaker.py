@@ -0,0 +1,161 @@
+"""Circuit breakers that stop hammering a platform while it is rate-limiting us"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# failures that say the platform is unreachable rather than the link being bad
+TRANSPORT_ERROR_INDICATORS = (
+    'timed out',
+    'timeout',
+    'connection reset',
+    'connection refused',
+    'connection aborted',
+    'remote end closed',
+)
+
+
+def is_transport_error(error_msg: str) -> bool:
+    message = str(error_msg).lower()
+    return any(indicator in message for indicator in TRANSPORT_ERROR_INDICATORS)
+
+
+class CircuitBreaker:
+    """Fail fast on one platform/extraction path after repeated block signals.
+
+    ``threshold`` failures (rate limits, login walls, timeouts) within
+    ``window`` seconds open the breaker: ``allow`` then returns False
+    without touching the network. After the cooldown one half-open probe
+    is let through; success closes the breaker, failure reopens it with the
+    cooldown doubled up to ``max_cooldown``. A probe that never reports
+    back is replaced after ``probe_timeout`` seconds; callers ``release``
+    a request that ends without an outcome. Outcomes that prove
+    the platform answered (including "post is private") count as success.
+    Thread-safe, since yt-dlp work reports from the download pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = 5,
+        window: float = 60.0,
+        cooldown: float = 120.0,
+        max_cooldown: float = 1800.0,
+        probe_timeout: float = 60.0,
+    ):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.window = window
+        self.base_cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.probe_timeout = probe_timeout
+        self.state = CLOSED
+        self._cooldown = cooldown
+        self._failures: Deque[float] = deque()
+        self._open_until = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        self.last_reason = ""
+
+    def allow(self) -> bool:
+        """True if a request may go out now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now >= self._open_until:
+                self.state = HALF_OPEN
+                self._probe_at = now
+                logger.info(f"Circuit {self.name} half-open, sending probe")
+                return True
+            if self.state == HALF_OPEN and now - self._probe_at >= self.probe_timeout:
+                self._probe_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self) -> None:
+        """An allowed request ended without an outcome (cache hit, refused
+        locally, cancelled): if it was the half-open probe, let the next
+        request probe instead of waiting out ``probe_timeout``. Safe to call
+        after an outcome was recorded, the breaker has left HALF_OPEN then.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_at = time.monotonic() - self.probe_timeout
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                logger.info(f"Circuit {self.name} closed, probe succeeded")
+                self.state = CLOSED
+                self._failures.clear()
+                self._cooldown = self.base_cooldown
+
+    def record_failure(self, reason: str = "") -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.last_reason = str(reason)[:200]
+            if self.state == HALF_OPEN:
+                self._trip(now, min(self._cooldown * 2, self.max_cooldown))
+                return
+            if self.state == OPEN:
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if len(self._failures) >= self.threshold:
+                self._trip(now, self.base_cooldown)
+
+    def _trip(self, now: float, cooldown: float) -> None:
+        self.state = OPEN
+        self._cooldown = cooldown
+        self._open_until = now + cooldown
+        self._failures.clear()
+        self.opened += 1
+        logger.warning(f"Circuit {self.name} open for {cooldown:.0f}s: {self.last_reason}")
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next probe may go out (0 when closed)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "retry_after": self.retry_after,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "recent_failures": len(self._failures),
+            "last_reason": self.last_reason,
+        }
+
+
+class CircuitBreakers:
+    """Shared registry: one breaker per ``platform:path`` with common settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self.settings)
+            return breaker
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in sorted(breakers.items())}
@@ -0,0 +1,97 @@
+"""Single-flight coalescing of concurrent downloads of the same media"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """One in-progress download shared by every request for the same key.
+
+    ``lock`` serialises the senders: the first one uploads, the rest can
+    then re-send the Telegram file_id that upload produced.
+    """
+
+    __slots__ = ("key", "task", "refs", "lock")
+
+    def __init__(self, key: Optional[str], task: asyncio.Future):
+        self.key = key
+        self.task = task
+        self.refs = 0
+        self.lock = asyncio.Lock()
+
+    @property
+    def shared(self) -> bool:
+        return self.refs > 1
+
+    @property
+    def result(self) -> Any:
+        return self.task.result()
+
+
+class RequestCoalescer:
+    """Run at most one download per canonical media key at a time.
+
+    Callers ``join`` a flight; the first one starts the download and every
+    concurrent caller awaits the same task. Flights are reference counted
+    and ``cleanup`` runs on the result only after the last caller leaves.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    @asynccontextmanager
+    async def join(
+        self,
+        key: Optional[str],
+        factory: Callable[[], Awaitable[Any]],
+        cleanup: Optional[Callable[[Any], None]] = None,
+    ) -> AsyncIterator[Flight]:
+        flight = self._flights.get(key) if key else None
+        if flight is None:
+            flight = Flight(key, asyncio.ensure_future(factory()))
+            if key:
+                self._flights[key] = flight
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced request for {key} ({flight.refs} already waiting)")
+        flight.refs += 1
+
+        try:
+            # shield: one waiter being cancelled must not cancel the shared download
+            await asyncio.shield(flight.task)
+            yield flight
+        finally:
+            flight.refs -= 1
+            if flight.refs == 0:
+                self._finish(flight, cleanup)
+
+    def _finish(self, flight: Flight, cleanup: Optional[Callable[[Any], None]]) -> None:
+        if flight.key and self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+        if not flight.task.done():
+            # every waiter gave up
+            flight.task.cancel()
+            return
+        if cleanup and not flight.task.cancelled() and flight.task.exception() is None:
+            try:
+                cleanup(flight.task.result())
+            except Exception as e:
+                logger.error(f"Cleanup failed for {flight.key}: {e}")
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self.in_flight,
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
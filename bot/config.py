@@ -31,4 +31,93 @@ class Config:
 
         self.GROQ_API_KEY  = os.getenv("GROQ_API_KEY", "")
 
+        # Jumlah worker untuk yt-dlp (download berjalan paralel di thread pool)
+        self.DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+        # Instance YoutubeDL dipakai ulang, dibuat ulang setelah N job
+        self.YDL_MAX_USES     = int(os.getenv("YDL_MAX_USES", "50"))
+        # Format dipilih agar muat batas upload Telegram (tolak sebelum download)
+        self.MAX_UPLOAD_MB    = int(os.getenv("MAX_UPLOAD_MB", "50"))
+
+        # Update Telegram diproses paralel (0/1 = berurutan seperti dulu); per user tetap urut
+        self.CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "32"))
+        # Ukuran pool koneksi ke Bot API (0 = otomatis dari CONCURRENT_UPDATES)
+        self.TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "0"))
+
+        # Pesan berisi banyak link: maks link diproses & berapa yang diunduh bersamaan
+        self.MAX_LINKS_PER_MESSAGE    = int(os.getenv("MAX_LINKS_PER_MESSAGE", "10"))
+        self.MESSAGE_LINK_CONCURRENCY = int(os.getenv("MESSAGE_LINK_CONCURRENCY", "3"))
+
+        # Pesan progres live: jeda minimal antar edit per pesan & total edit/detik semua job
+        self.PROGRESS_EDIT_INTERVAL    = float(os.getenv("PROGRESS_EDIT_INTERVAL", "3"))
+        self.PROGRESS_EDITS_PER_SECOND = float(os.getenv("PROGRESS_EDITS_PER_SECOND", "20"))
+
+        # Antrian download: total download jalan bersamaan, maks per user, bobot jalur
+        self.MAX_ACTIVE_DOWNLOADS      = int(os.getenv("MAX_ACTIVE_DOWNLOADS", "6"))
+        self.PER_USER_ACTIVE_DOWNLOADS = int(os.getenv("PER_USER_ACTIVE_DOWNLOADS", "2"))
+        weights_str = os.getenv("SCHEDULER_WEIGHTS", "admin:8,vip:4,free:1")
+        self.SCHEDULER_WEIGHTS = {
+            tier.strip(): float(weight)
+            for tier, weight in (item.split(":") for item in weights_str.split(",") if ":" in item)
+        }
+
+        # Admission control: di atas batas ini download gratis baru ditolak ("lagi rame")
+        # 0 = cek dimatikan. RSS dijaga di bawah max_memory_restart pm2 (512M)
+        self.SHED_MAX_IN_FLIGHT     = int(os.getenv("SHED_MAX_IN_FLIGHT", "40"))
+        self.SHED_MAX_QUEUED        = int(os.getenv("SHED_MAX_QUEUED", "20"))
+        self.SHED_MAX_DISK_FRACTION = float(os.getenv("SHED_MAX_DISK_FRACTION", "0.9"))
+        self.SHED_MAX_RSS_MB        = int(os.getenv("SHED_MAX_RSS_MB", "400"))
+
+        # Pembatas laju ke TikTok/Instagram per kelas endpoint: "nama=per_menit/burst,..."
+        # (kosong = bawaan, lihat bot/rate_governor.py). Job menunggu token maks RATE_MAX_WAIT_SECONDS
+        self.RATE_LIMITS           = os.getenv("RATE_LIMITS", "")
+        self.RATE_MAX_WAIT_SECONDS = float(os.getenv("RATE_MAX_WAIT_SECONDS", "20"))
+
+        # Circuit breaker per platform/jalur: N sinyal rate-limit dalam jendela → stop sementara
+        self.BREAKER_THRESHOLD            = int(os.getenv("BREAKER_THRESHOLD", "5"))
+        self.BREAKER_WINDOW_SECONDS       = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+        self.BREAKER_COOLDOWN_SECONDS     = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "120"))
+        self.BREAKER_MAX_COOLDOWN_MINUTES = float(os.getenv("BREAKER_MAX_COOLDOWN_MINUTES", "30"))
+
+        # Pool koneksi HTTP bersama untuk resolve link, oEmbed & CDN
+        self.HTTP_TIMEOUT         = float(os.getenv("HTTP_TIMEOUT", "15"))
+        self.HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+        self.HTTP_MAX_PER_HOST    = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+
+        # Slide carousel IG / slideshow TikTok diunduh paralel: per post & total per platform
+        self.CAROUSEL_CONCURRENCY    = int(os.getenv("CAROUSEL_CONCURRENCY", "4"))
+        self.MEDIA_FETCH_CONCURRENCY = int(os.getenv("MEDIA_FETCH_CONCURRENCY", "16"))
+
+        # Cache file_id Telegram: link yang sama dikirim ulang tanpa download/upload
+        self.MEDIA_CACHE_TTL_HOURS   = int(os.getenv("MEDIA_CACHE_TTL_HOURS", "72"))
+        self.MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "20000"))
+
+        # Cache resolve link pendek TikTok (vm./vt.tiktok.com)
+        self.RESOLVE_CACHE_SIZE      = int(os.getenv("RESOLVE_CACHE_SIZE", "2048"))
+        self.RESOLVE_CACHE_TTL_HOURS = float(os.getenv("RESOLVE_CACHE_TTL_HOURS", "6"))
+        self.RESOLVE_CACHE_PERSIST   = os.getenv("RESOLVE_CACHE_PERSIST", "True").lower() == "true"
+
+        # Cache hasil gagal permanen (dihapus/private/kebesaran), kedaluwarsa kalau konten kembali
+        self.DEAD_LINK_CACHE_SIZE        = int(os.getenv("DEAD_LINK_CACHE_SIZE", "4096"))
+        self.DEAD_LINK_CACHE_TTL_MINUTES = float(os.getenv("DEAD_LINK_CACHE_TTL_MINUTES", "60"))
+        self.DEAD_LINK_CACHE_PERSIST     = os.getenv("DEAD_LINK_CACHE_PERSIST", "True").lower() == "true"
+
+        # Metadata post Instagram (caption, daftar media) dipakai ulang per shortcode
+        self.IG_META_CACHE_TTL_MINUTES = float(os.getenv("IG_META_CACHE_TTL_MINUTES", "10"))
+        # Post Instagram: yt-dlp ikut balapan kalau scrape halaman belum selesai setelah N detik
+        # (0 = langsung balapan, negatif = berurutan seperti dulu)
+        self.IG_HEDGE_DELAY_SECONDS    = float(os.getenv("IG_HEDGE_DELAY_SECONDS", "1.5"))
+
+        # Folder download sementara: batas total, watermark eviksi LRU & umur maksimal file
+        self.MEDIA_STORE_MAX_MB          = int(os.getenv("MEDIA_STORE_MAX_MB", "2048"))
+        self.MEDIA_STORE_HIGH_WATERMARK  = float(os.getenv("MEDIA_STORE_HIGH_WATERMARK", "0.9"))
+        self.MEDIA_STORE_LOW_WATERMARK   = float(os.getenv("MEDIA_STORE_LOW_WATERMARK", "0.7"))
+        self.MEDIA_STORE_MAX_AGE_MINUTES = float(os.getenv("MEDIA_STORE_MAX_AGE_MINUTES", "60"))
+        self.MEDIA_STORE_SWEEP_SECONDS   = int(os.getenv("MEDIA_STORE_SWEEP_SECONDS", "60"))
+        # File .part dari download yang putus disimpan segini lama biar retry bisa lanjut (Range)
+        self.PARTIAL_MAX_AGE_MINUTES     = float(os.getenv("PARTIAL_MAX_AGE_MINUTES", "30"))
+        # Hash isi file: repost yang isinya sama di-hardlink & dikirim pakai file_id yang sudah ada
+        self.MEDIA_DEDUP                 = os.getenv("MEDIA_DEDUP", "True").lower() == "true"
+        # Foto/slide di bawah batas ini langsung dikirim dari RAM, tanpa file sementara
+        self.INMEMORY_MEDIA_MAX_KB       = int(os.getenv("INMEMORY_MEDIA_MAX_KB", "2048"))
+
         logger.info(f"Konfigurasi dimuat — Admin: {self.ADMIN_IDS}, Channel: {self.REQUIRED_CHANNELS}, Groq: {'✅' if self.GROQ_API_KEY else '❌ (tidak diset)'}")
@@ -75,6 +75,42 @@ MESSAGES = {
         "<i>Coba lagi atau pakai link lain! 🙏</i>"
     ),
 
+    "busy": (
+        "🚦 <b>Bot lagi rame banget kak</b>\n\n"
+        "<blockquote><code>⏳ Coba kirim linknya lagi beberapa menit lagi ya</code></blockquote>\n\n"
+        "<i>💎 Member VIP tetap dilayani walau lagi rame!</i>"
+    ),
+
+    "queued": (
+        "🕒 <b>Kamu di antrian #{position} kak</b>\n\n"
+        "<blockquote><code>⏳ Download mulai otomatis begitu giliranmu tiba</code></blockquote>\n\n"
+        "<i>💎 Member VIP dapat jalur prioritas!</i>"
+    ),
+
+    "progress": (
+        "⏳ <b>Sebentar ya kak, lagi diproses...</b>\n\n"
+        "<blockquote><code>{stage}</code></blockquote>\n\n"
+        "<i>Sabar sebentar, file kamu sedang disiapkan! 💫</i>"
+    ),
+
+    "progress_stages": {
+        "resolving":   "🔎 Mencari media...",
+        "downloading": "📥 Mengunduh",
+        "uploading":   "📤 Mengirim ke Telegram...",
+    },
+
+    "batch_progress": (
+        "⏳ <b>Lagi proses {total} link kak...</b>\n\n"
+        "<blockquote>{lines}</blockquote>{skipped}"
+    ),
+
+    "batch_done": (
+        "✅ <b>Selesai! {ok}/{total} link berhasil</b>\n\n"
+        "<blockquote>{lines}</blockquote>{skipped}"
+    ),
+
+    "batch_skipped": "\n\n<i>⚠️ {count} link dilewati karena limit harian habis.</i>",
+
     "vip_info": (
         "💎 <b>Upgrade VIP Premium</b>\n\n"
         "<blockquote>Pilih durasi paket VIP kamu:</blockquote>\n\n"
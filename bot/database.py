@@ -1,5 +1,7 @@
+import json
 import sqlite3
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
@@ -52,9 +54,35 @@ class Database:
                 )
             """)
 
+            # Cache file_id Telegram per media (TikTok video ID / shortcode Instagram)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS media_cache (
+                    media_key    TEXT PRIMARY KEY,
+                    media_type   TEXT,
+                    file_ids     TEXT,
+                    caption      TEXT,
+                    size_bytes   INTEGER   DEFAULT 0,
+                    hits         INTEGER   DEFAULT 0,
+                    created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Cache key-value umum (mis. hasil resolve link pendek TikTok)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS kv_cache (
+                    namespace  TEXT,
+                    key        TEXT,
+                    value      TEXT,
+                    expires_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
             cur.execute("CREATE INDEX IF NOT EXISTS idx_dl_user_date ON downloads(user_id, download_date)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_pay_status   ON payments(status)")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_users_vip    ON users(is_vip, vip_expires_at)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_cache_used   ON media_cache(last_used_at)")
 
             # Migration: rename trakteer_id → donation_id if the old column still exists
             try:
@@ -233,6 +261,106 @@ class Database:
                 (status, payment_id)
             )
 
+    # ── Media cache (Telegram file_id) ─────────────────────────────────────────
+
+    def get_cached_media(self, media_key: str, ttl_hours: int) -> Optional[Dict]:
+        with self._conn() as conn:
+            cur = conn.execute("""
+                SELECT media_type, file_ids, caption, size_bytes
+                FROM media_cache
+                WHERE media_key = ? AND created_at > datetime('now', ?)
+            """, (media_key, f"-{ttl_hours} hours"))
+            row = cur.fetchone()
+            if not row:
+                return None
+            conn.execute("""
+                UPDATE media_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP
+                WHERE media_key = ?
+            """, (media_key,))
+
+        media_type, file_ids, caption, size_bytes = row
+        return {
+            "media_key": media_key,
+            "type": media_type,
+            "items": json.loads(file_ids),
+            "caption": caption or "",
+            "size_bytes": size_bytes,
+        }
+
+    def save_cached_media(
+        self,
+        media_key: str,
+        media_type: str,
+        items: List[Dict],
+        caption: str = "",
+        size_bytes: int = 0,
+    ) -> None:
+        with self._conn() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO media_cache
+                    (media_key, media_type, file_ids, caption, size_bytes)
+                VALUES (?, ?, ?, ?, ?)
+            """, (media_key, media_type, json.dumps(items), caption, size_bytes))
+
+    def delete_cached_media(self, media_key: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM media_cache WHERE media_key = ?", (media_key,))
+
+    def prune_media_cache(self, ttl_hours: int, max_entries: int) -> int:
+        """Hapus entri kadaluarsa lalu entri paling lama tidak dipakai di atas max_entries."""
+        with self._conn() as conn:
+            expired = conn.execute(
+                "DELETE FROM media_cache WHERE created_at <= datetime('now', ?)",
+                (f"-{ttl_hours} hours",)
+            ).rowcount
+            evicted = conn.execute("""
+                DELETE FROM media_cache WHERE media_key IN (
+                    SELECT media_key FROM media_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (max_entries,)).rowcount
+
+        if expired or evicted:
+            logger.info(f"Media cache: {expired} kadaluarsa, {evicted} dievict (LRU)")
+        return expired + evicted
+
+    # ── Key-value cache (backend TTLCache) ─────────────────────────────────────
+
+    def cache_load(self, namespace: str, limit: int) -> List[tuple]:
+        """Entri yang belum kadaluarsa (key, value, expires_at), paling lama dulu."""
+        with self._conn() as conn:
+            cur = conn.execute("""
+                SELECT key, value, expires_at FROM (
+                    SELECT key, value, expires_at FROM kv_cache
+                    WHERE namespace = ? AND expires_at > ?
+                    ORDER BY expires_at DESC LIMIT ?
+                ) ORDER BY expires_at
+            """, (namespace, time.time(), limit))
+            return cur.fetchall()
+
+    def cache_set(self, namespace: str, key: str, value: str, expires_at: float) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at)
+            )
+
+    def cache_delete(self, namespace: str, key: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM kv_cache WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def purge_kv_cache(self) -> int:
+        with self._conn() as conn:
+            cur = conn.execute(
+                "DELETE FROM kv_cache WHERE expires_at <= ?", (time.time(),)
+            )
+            if cur.rowcount:
+                logger.info(f"KV cache: {cur.rowcount} entri kadaluarsa dihapus")
+            return cur.rowcount
+
     # ── Stats ──────────────────────────────────────────────────────────────────
 
     def get_user_stats(self) -> Dict:
@@ -249,10 +377,15 @@ class Database:
                 "SELECT status, COUNT(*) FROM payments GROUP BY status"
             ).fetchall()
             payment_stats = dict(payment_rows)
+            cache_entries, cache_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM media_cache"
+            ).fetchone()
 
         return {
             "total_users": total_users,
             "vip_users": vip_users,
             "downloads_today": downloads_today,
             "payment_stats": payment_stats,
+            "cache_entries": cache_entries,
+            "cache_hits": cache_hits,
         }
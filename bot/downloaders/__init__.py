@@ -1,5 +1,8 @@
 """Media downloaders for TikTok and Instagram"""
+from .executor import DownloadExecutor
+from .partials import PartialDownloads
+from .ydl_pool import YDLPool
 from .tiktok import TikTokDownloader
 from .instagram import InstagramDownloader
 
-__all__ = ["TikTokDownloader", "InstagramDownloader"]
+__all__ = ["DownloadExecutor", "PartialDownloads", "YDLPool", "TikTokDownloader", "InstagramDownloader"]
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadExecutor:
+    """Bounded thread pool shared by every downloader.
+
+    yt-dlp is fully synchronous, so extraction and downloads are submitted
+    here instead of running on the event loop. Queue depth and wait time are
+    tracked so admins can see when the pool is undersized.
+    """
+
+    SLOW_WAIT_SECONDS = 5.0
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="download",
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking callable in the pool and await its result"""
+        submitted = time.monotonic()
+        with self._lock:
+            self._queued += 1
+
+        def _job():
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+            if waited > self.SLOW_WAIT_SECONDS:
+                logger.warning(f"Download job waited {waited:.1f}s for a worker ({self.max_workers} workers)")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        future = self._pool.submit(_job)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future) -> None:
+        # A job cancelled before a worker picked it up never ran _job
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self._running + self._completed
+            return {
+                "workers": self.max_workers,
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self._completed,
+                "avg_wait": self._total_wait / started if started else 0.0,
+                "max_wait": self._max_wait,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,66 @@
+import logging
+from typing import Dict, Iterator, Optional
+
+from ..utils import DownloadException
+
+logger = logging.getLogger(__name__)
+
+# Bot API upload limit for send_video / send_photo
+TELEGRAM_UPLOAD_LIMIT = 50 * 1024 * 1024
+
+
+class FileTooLargeException(DownloadException):
+    """No available format fits under the upload budget"""
+    pass
+
+
+def estimate_size(fmt: Dict) -> Optional[float]:
+    """Best guess of a format's size in bytes from extract_info metadata.
+
+    yt-dlp fills ``filesize_approx`` from bitrate x duration before format
+    selection, so that covers formats without an exact ``filesize``.
+    """
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    return float(size) if size else None
+
+
+class SizeAwareFormatSelector:
+    """yt-dlp ``format`` callable: the best variant that fits ``max_bytes``.
+
+    Mirrors ``'best'`` (formats that carry both audio and video, yt-dlp
+    sorts them worst to best) but skips variants whose known or estimated
+    size is over budget. A video-only format is picked only when no
+    complete one fits; audio-only and storyboard formats never are.
+    Formats with no size information are
+    accepted; yt-dlp's ``max_filesize`` still guards those at download
+    time. Raises FileTooLargeException during ``extract_info``, before any
+    media bytes are fetched, when nothing fits.
+    """
+
+    def __init__(self, max_bytes: int = TELEGRAM_UPLOAD_LIMIT):
+        self.max_bytes = max_bytes
+
+    def __call__(self, ctx: Dict) -> Iterator[Dict]:
+        # unknown codecs (None) count as present, like 'best' does
+        videos = [f for f in ctx['formats'] if f.get('vcodec') != 'none']
+        complete = [f for f in videos if f.get('acodec') != 'none']
+        video_only = [f for f in videos if f.get('acodec') == 'none']
+
+        smallest = None
+        for candidates in (complete, video_only):
+            for fmt in reversed(candidates):
+                size = estimate_size(fmt)
+                if size is None or size <= self.max_bytes:
+                    if candidates is video_only:
+                        logger.warning(f"No complete format fits, falling back to video-only {fmt.get('format_id')}")
+                    if size is not None:
+                        logger.info(f"Selected format {fmt.get('format_id')} (~{size / 1048576:.1f} MB)")
+                    yield fmt
+                    return
+                smallest = size if smallest is None else min(smallest, size)
+
+        if smallest is not None:
+            raise FileTooLargeException(
+                f"File kegedhen kanggo Telegram (~{smallest / 1048576:.0f} MB, "
+                f"maks {self.max_bytes / 1048576:.0f} MB)."
+            )
@@ -0,0 +1,140 @@
+"""Hedged requests: start a backup strategy when the first one is slow"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Strategy = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class _StrategyStats:
+    __slots__ = ("started", "wins", "failures", "cancelled", "latencies")
+
+    def __init__(self, window: int):
+        self.started = 0
+        self.wins = 0
+        self.failures = 0
+        self.cancelled = 0
+        # latencies of winning answers
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Hedge:
+    """Race a primary and a secondary strategy, first good result wins.
+
+    The primary starts at once; the secondary starts after ``delay``
+    seconds, or as soon as the primary fails. The first result accepted by
+    ``ok`` wins and the other task is cancelled. Work already handed to a
+    thread cannot be interrupted, so strategies running in the download
+    pool should keep their result useful (e.g. cache it) when cancelled.
+    Per-strategy wins and winning latencies are kept so ``delay`` can be
+    tuned: it works best near the primary's p90 latency.
+    """
+
+    def __init__(self, delay: float, window: int = 200):
+        self.delay = max(0.0, delay)
+        self.window = window
+        self.runs = 0
+        self.hedged = 0
+        self._stats: Dict[str, _StrategyStats] = {}
+
+    def _strategy_stats(self, name: str) -> _StrategyStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _StrategyStats(self.window)
+        return stats
+
+    async def run(
+        self,
+        primary: Strategy,
+        secondary: Strategy,
+        ok: Callable[[Any], bool] = bool,
+    ) -> Tuple[Optional[str], Any]:
+        """``(winner, result)``, or ``(None, failure)`` when both strategies fail.
+
+        The reported failure is the secondary's (re-raised if it was an
+        exception), since it is the fallback path.
+        """
+        self.runs += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tasks: Dict[asyncio.Future, Tuple[str, float]] = {}
+        failures: Dict[str, Any] = {}
+
+        def launch(strategy: Strategy) -> None:
+            name, factory = strategy
+            self._strategy_stats(name).started += 1
+            tasks[asyncio.ensure_future(factory())] = (name, loop.time())
+
+        launch(primary)
+        pending = set(tasks)
+        try:
+            while pending:
+                waiting = len(tasks) == 1
+                timeout = max(0.0, started + self.delay - loop.time()) if waiting else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # primary is slow: hedge
+                    self.hedged += 1
+                    logger.debug(f"Hedging {primary[0]} with {secondary[0]} after {self.delay:g}s")
+                    launch(secondary)
+                    pending = {t for t, _ in tasks.items() if not t.done()}
+                    continue
+
+                for task in done:
+                    name, launched = tasks[task]
+                    stats = self._strategy_stats(name)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = e
+                    if not isinstance(result, Exception) and ok(result):
+                        stats.wins += 1
+                        stats.latencies.append(loop.time() - launched)
+                        return name, result
+                    stats.failures += 1
+                    failures[name] = result
+
+                if waiting and not pending:
+                    # primary failed before the hedge delay, go straight to the fallback
+                    launch(secondary)
+                    pending = {t for t, _ in tasks.items() if not t.done()}
+        finally:
+            for task, (name, _) in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    self._strategy_stats(name).cancelled += 1
+
+        failure = failures.get(secondary[0], failures.get(primary[0]))
+        if isinstance(failure, Exception):
+            raise failure
+        return None, failure
+
+    def stats(self) -> Dict:
+        return {
+            "delay": self.delay,
+            "runs": self.runs,
+            "hedged": self.hedged,
+            "strategies": {
+                name: {
+                    "started": s.started,
+                    "wins": s.wins,
+                    "win_rate": s.wins / s.started if s.started else 0.0,
+                    "failures": s.failures,
+                    "cancelled": s.cancelled,
+                    "p50": s.percentile(0.5),
+                    "p90": s.percentile(0.9),
+                }
+                for name, s in self._stats.items()
+            },
+        }
@@ -0,0 +1,152 @@
+"""Incremental Instagram post page extractor.
+
+Reads the page chunk by chunk and only looks at ``<meta>`` and
+``<script>`` elements, so there is no DOM to build. Extraction stops as
+soon as the author, the caption and the complete carousel data have been
+seen, and the rest of the page is never downloaded.
+"""
+import html
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TAG_START = re.compile(r'<(meta|script)\b', re.IGNORECASE)
+TAG_END = re.compile(r'>')
+SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+ATTR = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+DISPLAY_URL = re.compile(r'"display_url":"(https:\\\/\\\/[^"]+)"')
+DISPLAY_RESOURCES = re.compile(r'"display_resources":\[.*?"src":"(https:\\\/\\\/[^"]+)"')
+OG_CAPTION_PATTERN = re.compile(r'^.*?:\s*"(.*)"\s*\.?\s*$', re.DOTALL)
+
+# enough to hold the longest partial tag name at a chunk boundary
+_TAIL = len('<script')
+
+
+class InstagramPageExtractor:
+    """Feed decoded HTML chunks; ``feed`` returns True once nothing else is needed.
+
+    Picks the same fields as the old BeautifulSoup scraper: ``og:title``
+    (author), ``og:description`` (caption), JSON-LD images, author and
+    caption, and every ``display_url`` / ``display_resources`` URL in a
+    script that mentions ``carousel_media``. ``max_chars`` bounds how
+    much of a page is read when it has no carousel data.
+    """
+
+    def __init__(self, max_chars: int = 4 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.author: Optional[str] = None
+        self.caption: Optional[str] = None
+        self.images: List[str] = []
+        self.carousel_seen = False
+        self.chars_read = 0
+        self._buf = ''
+        # where to resume looking for </script> when a script spans chunks
+        self._close_from = 0
+        self._title_seen = False
+        self._description_seen = False
+
+    @property
+    def done(self) -> bool:
+        return (
+            self._title_seen and self._description_seen and self.carousel_seen
+        ) or self.chars_read >= self.max_chars
+
+    def feed(self, chunk: str) -> bool:
+        self.chars_read += len(chunk)
+        buf = self._buf + chunk
+        pos = 0
+        while True:
+            start = TAG_START.search(buf, pos)
+            if start is None:
+                pos = max(pos, len(buf) - _TAIL)
+                break
+            if start.group(1).lower() == 'meta':
+                end = TAG_END.search(buf, start.end())
+                if end is None:
+                    pos = start.start()
+                    break
+                self._meta(buf[start.end():end.start()])
+                pos = end.end()
+            else:
+                open_end = TAG_END.search(buf, start.end())
+                close = None
+                if open_end:
+                    close = SCRIPT_END.search(buf, max(open_end.end(), self._close_from))
+                if close is None:
+                    pos = start.start()
+                    if open_end:
+                        self._close_from = max(open_end.end(), len(buf) - len('</script>')) - pos
+                    break
+                self._close_from = 0
+                self._script(buf[start.end():open_end.start()], buf[open_end.end():close.start()])
+                pos = close.end()
+        self._buf = buf[pos:]
+        return self.done
+
+    def _meta(self, attrs_text: str) -> None:
+        attrs = self._attrs(attrs_text)
+        prop = attrs.get('property')
+        content = attrs.get('content')
+        if not content:
+            return
+        if prop == 'og:title' and not self._title_seen and ' on Instagram' in content:
+            self.author = content.split(' on Instagram')[0].strip()
+            self._title_seen = True
+        elif prop == 'og:description' and not self._description_seen:
+            match = OG_CAPTION_PATTERN.match(content)
+            self.caption = match.group(1) if match else content
+            self._description_seen = True
+
+    def _script(self, attrs_text: str, body: str) -> None:
+        if 'application/ld+json' in attrs_text and body.strip():
+            self._json_ld(body)
+        if 'carousel_media' in body:
+            self.carousel_seen = True
+            for pattern in (DISPLAY_URL, DISPLAY_RESOURCES):
+                for match in pattern.findall(body):
+                    self.images.append(match.replace('\\u0026', '&').replace('\\/', '/'))
+
+    def _json_ld(self, body: str) -> None:
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            logger.error(f"Error parsing JSON LD: {e}")
+            return
+        if not isinstance(data, dict) or 'image' not in data:
+            return
+        image = data['image']
+        for img in image if isinstance(image, list) else [image]:
+            if isinstance(img, str):
+                self.images.append(img)
+            elif isinstance(img, dict) and 'url' in img:
+                self.images.append(img['url'])
+        author = data.get('author')
+        if not self.author and isinstance(author, dict) and 'name' in author:
+            self.author = author['name']
+        if not self.caption:
+            self.caption = data.get('caption') or data.get('articleBody')
+
+    @staticmethod
+    def _attrs(text: str) -> Dict[str, str]:
+        return {
+            m.group(1).lower(): html.unescape(m.group(2) if m.group(2) is not None else m.group(3))
+            for m in ATTR.finditer(text)
+        }
+
+    def media_urls(self) -> List[str]:
+        """Ordered, de-duplicated absolute media URLs"""
+        urls = (url.replace('\\', '') for url in dict.fromkeys(self.images))
+        return [url for url in dict.fromkeys(urls) if url.startswith('http')]
+
+
+def extract_page(page: str, chunk_size: int = 16384) -> InstagramPageExtractor:
+    """Run the extractor over an already downloaded page (tests, benchmarks)"""
+    extractor = InstagramPageExtractor()
+    for i in range(0, len(page), chunk_size):
+        if extractor.feed(page[i:i + chunk_size]):
+            break
+    return extractor
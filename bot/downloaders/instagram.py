@@ -1,16 +1,27 @@
+import copy
 import os
 import re
-import json
 import logging
 import tempfile
-import requests
 import asyncio
+import math
 from datetime import datetime
 from collections import defaultdict
+import httpx
 import yt_dlp
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
-from ..utils import sanitize_text
+from typing import Dict, List, Optional, Union
+from ..cache import TTLCache
+from ..circuit_breaker import CircuitBreaker, CircuitBreakers, is_transport_error
+from ..http_client import HttpClient
+from ..media_store import MediaStore, MemoryMedia
+from ..rate_governor import RateGovernor, RateLimitedException
+from ..utils import DownloadException, sanitize_text
+from .executor import DownloadExecutor
+from .formats import TELEGRAM_UPLOAD_LIMIT, FileTooLargeException, SizeAwareFormatSelector
+from .hedge import Hedge
+from .ig_extract import InstagramPageExtractor
+from .partials import PartialDownloads, plan_download
+from .ydl_pool import ProgressCallback, YDLPool
 
 logger = logging.getLogger(__name__)
 
@@ -18,16 +29,62 @@ INSTAGRAM_URL_PATTERN = re.compile(
     r'https?://(www\.)?instagram\.com/([a-zA-Z0-9_\.]+/)?([p|reel|stories]/)?([^/?#&]+)'
 )
 
+PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
 class InstagramDownloader:
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[DownloadExecutor] = None,
+        http: Optional[HttpClient] = None,
+        carousel_concurrency: int = 4,
+        media_fetch_concurrency: int = 16,
+        meta_cache: Optional[TTLCache] = None,
+        ydl_max_uses: int = 50,
+        max_filesize: int = TELEGRAM_UPLOAD_LIMIT,
+        store: Optional[MediaStore] = None,
+        breakers: Optional[CircuitBreakers] = None,
+        governor: Optional[RateGovernor] = None,
+        partials: Optional[PartialDownloads] = None,
+        hedge_delay: Optional[float] = None,
+    ):
+        # blocking yt-dlp work runs in the shared download pool
+        self.executor = executor or DownloadExecutor()
+        # keep-alive HTTP pool shared with the other downloaders
+        self.http = http or HttpClient()
+        # slides fetched in parallel per post, and across all posts at once
+        self.carousel_concurrency = max(1, carousel_concurrency)
+        self._media_fetch_limit = asyncio.Semaphore(max(1, media_fetch_concurrency))
+        # short-lived per-shortcode metadata so a post is only extracted once
+        self.meta_cache = meta_cache or TTLCache(maxsize=256, ttl=600)
+
         # create and reuse a single subdirectory under the system temp folder
         self.download_dir = os.path.join(tempfile.gettempdir(), "jawanese_bot_instagram")
-        os.makedirs(self.download_dir, exist_ok=True)
+        # every file handed out is tracked against the shared disk budget
+        self.store = store or MediaStore()
+        self.store.register_dir(self.download_dir)
+        # page scraping and yt-dlp get blocked independently, so each has its own breaker
+        self.breakers = breakers or CircuitBreakers()
+        self.html_breaker = self.breakers.get("instagram:html")
+        self.ytdlp_breaker = self.breakers.get("instagram:ytdlp")
+        # paces page/extract calls and CDN fetches so bursts do not earn us a 429
+        self.governor = governor or RateGovernor()
+        # interrupted downloads resume from their .part file on retry
+        self.partials = partials or PartialDownloads()
+        # posts: race the page scrape against yt-dlp after hedge_delay (None = sequential)
+        self.hedge = Hedge(hedge_delay) if hedge_delay is not None else None
 
         # OPTIMIZED yt-dlp configuration
         self.ydl_opts = {
-            'outtmpl': os.path.join(self.download_dir, '%(id)s.%(ext)s'),
-            'format': 'best',
+            # keyed by media and format so a retry resumes the right partial file
+            'outtmpl': os.path.join(self.download_dir, '%(id)s.%(format_id)s.%(ext)s'),
+            'continuedl': True,
+            'nopart': False,
+            'format': SizeAwareFormatSelector(max_filesize),
+            'max_filesize': max_filesize,
             'quiet': True,
             'no_warnings': True,
             'extractaudio': False,
@@ -38,6 +95,14 @@ class InstagramDownloader:
             'concurrent_fragment_downloads': 3,
         }
 
+        # warm YoutubeDL instances, one per download worker
+        self.ydl_pool = YDLPool(
+            self.ydl_opts,
+            size=self.executor.max_workers,
+            max_uses=ydl_max_uses,
+            name="instagram",
+        )
+
     def is_instagram_url(self, url: str) -> bool:
         """Check if URL is Instagram URL"""
         return bool(INSTAGRAM_URL_PATTERN.match(url))
@@ -50,244 +115,432 @@ class InstagramDownloader:
         return None
 
     def _is_rate_limit_error(self, error_msg: str) -> bool:
-        """Detect rate limit or auth errors for fast-fail"""
+        """Detect rate limit or auth errors for fast-fail
+
+        Only unambiguous signals: a bare "not available" is also what deleted,
+        private and region-blocked posts say, and those are per-post failures.
+        """
         rate_limit_indicators = [
             'rate-limit',
             '429',
             'Too Many Requests',
             'login required',
-            'not available',
-            'Requested content is not available'
         ]
         return any(indicator.lower() in str(error_msg).lower() for indicator in rate_limit_indicators)
 
-    async def download_carousel(self, url: str) -> List[str]:
-        """Special function to download Instagram carousel posts"""
-        logger.info(f"Starting Instagram carousel download: {url}")
-
-        carousel_media_paths = []
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
+    def _is_fatal_error(self, error_msg: str) -> bool:
+        """Detect errors that stay the same on retry (deleted, private, invalid link)"""
+        if self._is_rate_limit_error(error_msg):
+            return False
+        fatal_indicators = [
+            'Unsupported URL',
+            'HTTP Error 404',
+            'does not exist',
+            'removed',
+            'deleted',
+            'private',
+            'not available',
+        ]
+        return any(indicator.lower() in str(error_msg).lower() for indicator in fatal_indicators)
+
+    def _record_outcome(self, breaker: CircuitBreaker, error_msg: str, endpoint: str) -> None:
+        """Rate limits and timeouts trip the breaker; any other answer proves Instagram is serving us"""
+        if self._is_rate_limit_error(error_msg):
+            self.governor.throttled(endpoint)
+        if self._is_rate_limit_error(error_msg) or is_transport_error(error_msg):
+            breaker.record_failure(error_msg)
+        else:
+            breaker.record_success()
+
+    @staticmethod
+    def _circuit_open(breaker: CircuitBreaker) -> Dict:
+        minutes = max(1, math.ceil(breaker.retry_after / 60))
+        return {
+            "success": False,
+            "error": f"Instagram lagi rate-limit. Coba lagi sekitar {minutes} menit atau pake link lain."
         }
 
+    async def scrape_post(self, url: str) -> Optional[Dict]:
+        """Scrape the post page once: author, caption and ordered media URLs
+
+        The page is streamed through InstagramPageExtractor and the
+        connection is dropped as soon as the carousel data has been read.
+        """
+        if not self.html_breaker.allow():
+            logger.info("Instagram page scraping skipped: circuit open")
+            return None
+        try:
+            await self.governor.acquire("instagram:metadata")
+        except BaseException:
+            self.html_breaker.release()
+            raise
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            html_content = response.text
-
-            soup = BeautifulSoup(html_content, 'html.parser')
-            image_urls = []
-            username = None
-
-            # Extract username
-            for meta in soup.find_all('meta', property='og:title'):
-                if meta.get('content'):
-                    content = meta.get('content')
-                    if ' on Instagram' in content:
-                        username = content.split(' on Instagram')[0].strip()
+            extractor = InstagramPageExtractor()
+            async with self.http.stream("GET", url, headers=PAGE_HEADERS, timeout=10) as response:
+                if response.status_code == 429 or 'accounts/login' in str(response.url):
+                    self.governor.throttled("instagram:metadata")
+                    self.html_breaker.record_failure(f"HTTP {response.status_code} {response.url}")
+                    logger.warning(f"Instagram page blocked: HTTP {response.status_code}")
+                    return None
+                async for chunk in response.aiter_text():
+                    if extractor.feed(chunk):
                         break
+            self.html_breaker.record_success()
+            self.governor.ok("instagram:metadata")
+            logger.info(f"Instagram page scraped: read {extractor.chars_read} chars")
+
+            return {
+                "shortcode": self.extract_post_id(url),
+                "type": "carousel",
+                "author": extractor.author,
+                "caption": extractor.caption or "",
+                "media": extractor.media_urls(),
+            }
+
+        except httpx.TransportError as e:
+            self.html_breaker.record_failure(repr(e))
+            logger.error(f"Error scraping Instagram post: {e!r}")
+            return None
+        except Exception as e:
+            logger.error(f"Error scraping Instagram post: {e}")
+            return None
+        finally:
+            # no-op once an outcome was recorded; frees a cancelled half-open probe
+            self.html_breaker.release()
+
+    async def download_carousel(
+        self, url: str, post: Optional[Dict] = None, progress: Optional[ProgressCallback] = None,
+    ) -> List[Union[MemoryMedia, str]]:
+        """Special function to download Instagram carousel posts"""
+        logger.info(f"Starting Instagram carousel download: {url}")
 
-            # Extract from JSON-LD
-            for script in soup.find_all('script', type='application/ld+json'):
-                script_content = script.string if hasattr(script, 'string') else None
-                if script_content:
-                    try:
-                        data = json.loads(script_content)
-                        if isinstance(data, dict) and 'image' in data:
-                            if isinstance(data['image'], list):
-                                for img in data['image']:
-                                    if isinstance(img, str):
-                                        image_urls.append(img)
-                                    elif isinstance(img, dict) and 'url' in img:
-                                        image_urls.append(img['url'])
-                            elif isinstance(data['image'], str):
-                                image_urls.append(data['image'])
-
-                            if not username and 'author' in data and 'name' in data['author']:
-                                username = data['author']['name']
-                    except Exception as e:
-                        logger.error(f"Error parsing JSON LD: {e}")
-
-            # Regex patterns
-            carousel_patterns = [
-                r'"display_url":"(https:\\\/\\\/[^"]+)"',
-                r'"display_resources":\[.*?"src":"(https:\\\/\\\/[^"]+)"',
-            ]
-
-            for script in soup.find_all('script'):
-                script_content = script.string if hasattr(script, 'string') else None
-                if script_content and 'carousel_media' in script_content:
-                    for pattern in carousel_patterns:
-                        matches = re.findall(pattern, script_content)
-                        for match in matches:
-                            clean_url = match.replace('\\u0026', '&').replace('\\/', '/')
-                            if clean_url not in image_urls:
-                                image_urls.append(clean_url)
-
-            # Remove duplicates and normalize
-            image_urls = list(set(image_urls))
-            valid_image_urls = [img_url.replace('\\', '') for img_url in image_urls if img_url.replace('\\', '').startswith('http')]
-
-            post_id = self.extract_post_id(url)
-
-            # Download each image
-            for i, img_url in enumerate(valid_image_urls):
-                base_filename = f"{username}_{post_id}_part_{i+1}" if username else f"instagram_{post_id}_part_{i+1}"
-                extension = ".jpg"
-
-                if "." in img_url.split("?")[0].split("/")[-1]:
-                    ext = "." + img_url.split("?")[0].split("/")[-1].split(".")[-1]
-                    if ext.lower() in ['.jpg', '.jpeg', '.png', '.mp4', '.webp']:
-                        extension = ext
-
-                image_path = os.path.join(self.download_dir, f"{base_filename}{extension}")
+        if post is None:
+            post = await self.scrape_post(url)
+        if not post or not post["media"]:
+            return []
+
+        username = post["author"]
+        post_id = post["shortcode"]
+        post_limit = asyncio.Semaphore(self.carousel_concurrency)
+        fetched = 0
+
+        def _slide_done() -> None:
+            nonlocal fetched
+            fetched += 1
+            if progress:
+                progress("downloading", fetched * 100 / len(post["media"]))
+
+        async def _fetch_slide(i: int, img_url: str) -> Union[MemoryMedia, str, None]:
+            base_filename = f"{username}_{post_id}_part_{i+1}" if username else f"instagram_{post_id}_part_{i+1}"
+            extension = ".jpg"
+
+            if "." in img_url.split("?")[0].split("/")[-1]:
+                ext = "." + img_url.split("?")[0].split("/")[-1].split(".")[-1]
+                if ext.lower() in ['.jpg', '.jpeg', '.png', '.mp4', '.webp']:
+                    extension = ext
+
+            image_path = os.path.join(self.download_dir, f"{base_filename}{extension}")
+            await self.governor.acquire("instagram:media")
+            async with post_limit, self._media_fetch_limit:
                 try:
-                    image_response = requests.get(img_url, headers=headers, timeout=10)
+                    image_response = await self.http.get(img_url, headers=PAGE_HEADERS, timeout=10)
+                    if image_response.status_code == 429:
+                        self.governor.throttled("instagram:media")
                     if image_response.status_code == 200:
-                        with open(image_path, 'wb') as f:
-                            f.write(image_response.content)
-                        carousel_media_paths.append(image_path)
+                        self.governor.ok("instagram:media")
+                        # small slides stay in memory, big ones go to disk
+                        return await self.store.keep(image_response.content, image_path)
                 except Exception as e:
                     logger.error(f"Error downloading carousel image {i+1}: {e}")
+                finally:
+                    _slide_done()
+            return None
 
-            return carousel_media_paths if carousel_media_paths else []
-
+        try:
+            # Fetch every slide concurrently; gather keeps results in slide order
+            results = await asyncio.gather(
+                *(_fetch_slide(i, img_url) for i, img_url in enumerate(post["media"])),
+                return_exceptions=True,
+            )
+            refused = next((r for r in results if isinstance(r, RateLimitedException)), None)
+            if refused:
+                # no partial albums: drop what was fetched and report the backlog
+                for path in results:
+                    self.store.release(path)
+                raise refused
+            return [path for path in results if path and not isinstance(path, BaseException)]
+
+        except RateLimitedException:
+            raise
         except Exception as e:
             logger.error(f"General carousel error: {e}")
             return []
 
-    async def download(self, url: str) -> Dict:
-        """OPTIMIZED main download method for Instagram content"""
+    async def download(self, url: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        """OPTIMIZED main download method for Instagram content
+
+        Each post is extracted once; the metadata (caption, media list,
+        author) is reused by every later stage and cached by shortcode.
+        ``progress`` receives the current stage and download percentage.
+        """
         try:
+            if progress:
+                progress("resolving", None)
             # Check if it's carousel/post first
             is_instagram_post = 'instagram.com' in url and '/p/' in url
+            shortcode = self.extract_post_id(url)
+
+            if is_instagram_post and self.hedge is not None:
+                return await self._download_hedged(url, shortcode, progress)
 
             if is_instagram_post:
                 # Try carousel download first
-                media_paths = await self.download_carousel(url)
-
-                if media_paths:
-                    caption_text = ""
-                    try:
-                        with yt_dlp.YoutubeDL({'quiet': True, 'socket_timeout': 5}) as ydl:
-                            info = ydl.extract_info(url, download=False)
-                            if info and (info.get('description') or info.get('title')):
-                                original_caption = info.get('description') or info.get('title') or ''
-                                if original_caption:
-                                    cleaned_caption = sanitize_text(original_caption)
-                                    caption_text = f"<i>{cleaned_caption[:500]}...</i>" if len(cleaned_caption) > 500 else f"<i>{cleaned_caption}</i>"
-                    except Exception as e:
-                        logger.warning(f"Could not extract caption: {e}")
-
-                    return {
-                        "success": True,
-                        "type": "carousel",
-                        "files": media_paths,
-                        "count": len(media_paths),
-                        "caption": caption_text
-                    }
-
-            # OPTIMIZED: Try only ONE best format with fast-fail
-            try:
-                opts = self.ydl_opts.copy()
-
-                with yt_dlp.YoutubeDL(opts) as ydl:
-                    # Extract info first
-                    try:
-                        info = ydl.extract_info(url, download=False)
-                    except yt_dlp.DownloadError as e:
-                        error_msg = str(e)
-                        # FAST-FAIL: Check for rate limit immediately
-                        if self._is_rate_limit_error(error_msg):
-                            logger.warning(f"Instagram rate limit detected, failing fast")
-                            return {
-                                "success": False, 
-                                "error": "Instagram lagi rate-limit. Tunggu 30-60 menit atau gunakan link lain."
-                            }
-                        raise
-
-                    if not info:
-                        return {"success": False, "error": "Ora iso extract info dari Instagram."}
-
-                    title = info.get('title', 'Instagram Media')
-                    media_id = info.get('id', 'unknown')
-
-                    # Download the media
-                    ydl.download([url])
-
-                    # Find the downloaded file
-                    expected_filename = ydl.prepare_filename(info)
-
-                    if os.path.exists(expected_filename):
-                        file_path = expected_filename
-                    else:
-                        # Try to find file by pattern
-                        for file in os.listdir(self.download_dir):
-                            if media_id in file and file.endswith(('.mp4', '.jpg', '.jpeg', '.png')):
-                                file_path = os.path.join(self.download_dir, file)
-                                break
-                        else:
-                            return {"success": False, "error": "File download ora ketemu."}
-
-                    logger.info(f"Downloaded Instagram media: {file_path}")
-
-                    # Determine media type
-                    media_type = "video" if file_path.endswith(('.mp4', '.mov', '.avi')) else "photo"
-
-                    # Extract caption
-                    caption_text = ""
-                    if info:
-                        original_caption = info.get('description') or info.get('title') or info.get('alt_title') or ''
-
-                        if original_caption and original_caption.strip():
-                            cleaned_caption = sanitize_text(original_caption.strip())
-                            if len(cleaned_caption) > 300:
-                                cleaned_caption = cleaned_caption[:300] + "..."
-                            caption_text = f"`{cleaned_caption}`"
-
-                    return {
-                        "success": True,
-                        "type": media_type,
-                        "file_path": file_path,
-                        "title": title,
-                        "caption": caption_text
-                    }
-
-            except yt_dlp.DownloadError as e:
-                error_msg = str(e)
-                if self._is_rate_limit_error(error_msg):
-                    return {
-                        "success": False,
-                        "error": "Instagram rate-limit. Coba lagi 30-60 menit atau pake link lain."
-                    }
-                logger.error(f"yt-dlp error: {e}")
-                return {"success": False, "error": "Ora iso download Instagram. Mungkin private atau dihapus."}
-            except Exception as e:
-                logger.error(f"Instagram download error: {e}")
+                post = await self._post_metadata(url, shortcode)
+
+                if post and post["media"]:
+                    carousel = await self._download_post(url, post, progress)
+                    if carousel:
+                        return carousel
+
+            return await self._download_with_ytdlp(url, shortcode, progress)
+
+        except Exception as e:
+            logger.error(f"General Instagram download error: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def _download_post(self, url: str, post: Dict, progress: Optional[ProgressCallback] = None) -> Optional[Dict]:
+        """Fetch the scraped media list as a carousel result (None if no slide came through)"""
+        media_paths = await self.download_carousel(url, post, progress)
+        if not media_paths:
+            return None
+
+        caption_text = ""
+        if post["caption"]:
+            cleaned_caption = sanitize_text(post["caption"])
+            caption_text = f"<i>{cleaned_caption[:500]}...</i>" if len(cleaned_caption) > 500 else f"<i>{cleaned_caption}</i>"
+
+        return {
+            "success": True,
+            "type": "carousel",
+            "files": media_paths,
+            "count": len(media_paths),
+            "caption": caption_text
+        }
+
+    async def _download_hedged(
+        self, url: str, shortcode: Optional[str], progress: Optional[ProgressCallback] = None,
+    ) -> Dict:
+        """Race page scraping against yt-dlp extraction, then download from the winner"""
+
+        async def _scrape() -> Dict:
+            post = await self._post_metadata(url, shortcode)
+            return {"success": bool(post and post["media"]), "post": post}
+
+        def _usable(result: Dict) -> bool:
+            if not result["success"]:
+                return False
+            # yt-dlp playlist info (carousel) drops image slides: only the page scrape may win those
+            info = result.get("info")
+            return info is None or info.get('_type') in (None, 'video')
+
+        winner, result = await self.hedge.run(
+            ("html", _scrape),
+            ("ytdlp", lambda: self._extract_info(url, shortcode)),
+            ok=_usable,
+        )
+        logger.info(f"Instagram extraction for {shortcode}: {winner or 'both failed'}")
+
+        if winner == "html":
+            carousel = await self._download_post(url, result["post"], progress)
+            if carousel:
+                return carousel
+            return await self._download_with_ytdlp(url, shortcode, progress)
+        if winner == "ytdlp" or result.get("success"):
+            # a single video, or the page scrape failed too: same last resort as the sequential path
+            await self.governor.acquire("instagram:media")
+            return await self.executor.run(self._download_info_sync, result["info"], progress)
+        return result
+
+    async def _post_metadata(self, url: str, shortcode: Optional[str]) -> Optional[Dict]:
+        key = f"html:{shortcode}" if shortcode else None
+        post = self.meta_cache.get(key) if key else None
+        if post is None:
+            post = await self.scrape_post(url)
+            if post and key:
+                self.meta_cache.set(key, post)
+        return post
+
+    async def _download_with_ytdlp(
+        self, url: str, shortcode: Optional[str], progress: Optional[ProgressCallback] = None,
+    ) -> Dict:
+        """Extract once (or reuse cached info), then download from that info"""
+        extracted = await self._extract_info(url, shortcode)
+        if not extracted["success"]:
+            return extracted
+
+        await self.governor.acquire("instagram:media")
+        return await self.executor.run(self._download_info_sync, extracted["info"], progress)
+
+    async def _extract_info(self, url: str, shortcode: Optional[str]) -> Dict:
+        """yt-dlp info for the post, from the metadata cache when possible
+
+        The extraction keeps running in its worker thread if the caller is
+        cancelled (a lost hedge race); its info is still cached for later.
+        """
+        key = f"ytdlp:{shortcode}" if shortcode else None
+        info = self.meta_cache.get(key) if key else None
+        if info is not None:
+            return {"success": True, "info": info}
+
+        if not self.ytdlp_breaker.allow():
+            logger.warning("Instagram yt-dlp skipped: circuit open")
+            return self._circuit_open(self.ytdlp_breaker)
+        try:
+            await self.governor.acquire("instagram:metadata")
+            job = asyncio.ensure_future(self.executor.run(self._extract_info_sync, url))
+
+            def _cache(done: asyncio.Future) -> None:
+                if key and not done.cancelled() and not done.exception() and done.result()["success"]:
+                    self.meta_cache.set(key, done.result()["info"])
+
+            job.add_done_callback(_cache)
+            return await asyncio.shield(job)
+        finally:
+            # the extraction records its own outcome; this frees a probe refused or cancelled early
+            self.ytdlp_breaker.release()
+
+    def _extract_info_sync(self, url: str) -> Dict:
+        """yt-dlp metadata extraction (runs in the download pool)"""
+        # OPTIMIZED: Try only ONE best format with fast-fail
+        try:
+            with self.ydl_pool.checkout() as ydl:
+                info = ydl.extract_info(url, download=False)
+            self.ytdlp_breaker.record_success()
+            self.governor.ok("instagram:metadata")
+            if not info:
+                return {"success": False, "error": "Ora iso extract info dari Instagram."}
+            return {"success": True, "info": info}
+
+        except yt_dlp.DownloadError as e:
+            error_msg = str(e)
+            self._record_outcome(self.ytdlp_breaker, error_msg, "instagram:metadata")
+            # FAST-FAIL: Check for rate limit immediately
+            if self._is_rate_limit_error(error_msg):
+                logger.warning(f"Instagram rate limit detected, failing fast")
                 return {
                     "success": False,
-                    "error": f"Maaf kak, ada kendala saat download: {str(e)}"
+                    "error": "Instagram lagi rate-limit. Tunggu 30-60 menit atau gunakan link lain."
                 }
+            logger.error(f"yt-dlp error: {e}")
+            return {
+                "success": False,
+                "error": "Ora iso download Instagram. Mungkin private atau dihapus.",
+                "permanent": self._is_fatal_error(error_msg),
+            }
+        except DownloadException as e:
+            self.ytdlp_breaker.record_success()
+            logger.warning(f"Instagram download rejected: {e}")
+            return {"success": False, "error": str(e), "permanent": isinstance(e, FileTooLargeException)}
+        except Exception as e:
+            if is_transport_error(str(e)):
+                self.ytdlp_breaker.record_failure(str(e))
+            logger.error(f"Instagram download error: {e}")
+            return {
+                "success": False,
+                "error": f"Maaf kak, ada kendala saat download: {str(e)}"
+            }
+
+    def _download_info_sync(self, info: Dict, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Download media from already-extracted info (runs in the download pool)
+
+        ``info`` may be the shared meta_cache entry and yt-dlp processes its
+        argument in place, so every download works on its own deep copy.
+        """
+        info = copy.deepcopy(info)
+        try:
+            with self.ydl_pool.checkout(progress) as ydl:
+                title = info.get('title', 'Instagram Media')
+                media_id = info.get('id', 'unknown')
+
+                # Check the partial file of the chosen format, then download
+                # the media without a second extraction round trip
+                target, expected_size = plan_download(ydl, info)
+                self.partials.prepare(target, expected_size)
+                downloaded = ydl.process_ie_result(info, download=True)
+                self.ytdlp_breaker.record_success()
+                self.governor.ok("instagram:media")
+
+                # Find the downloaded file
+                expected_filename = ydl.prepare_filename(downloaded or info)
+
+                if os.path.exists(expected_filename):
+                    file_path = expected_filename
+                else:
+                    # Try to find file by pattern
+                    for file in os.listdir(self.download_dir):
+                        if media_id in file and file.endswith(('.mp4', '.jpg', '.jpeg', '.png')):
+                            file_path = os.path.join(self.download_dir, file)
+                            break
+                    else:
+                        return {"success": False, "error": "File download ora ketemu."}
+
+                if file_path == target and not self.partials.verify(file_path, expected_size):
+                    return {"success": False, "error": "File download rusak, coba kirim link e maneh."}
 
+                self.store.track(file_path)
+                logger.info(f"Downloaded Instagram media: {file_path}")
+
+                # Determine media type
+                media_type = "video" if file_path.endswith(('.mp4', '.mov', '.avi')) else "photo"
+
+                # Extract caption
+                caption_text = ""
+                original_caption = info.get('description') or info.get('title') or info.get('alt_title') or ''
+
+                if original_caption and original_caption.strip():
+                    cleaned_caption = sanitize_text(original_caption.strip())
+                    if len(cleaned_caption) > 300:
+                        cleaned_caption = cleaned_caption[:300] + "..."
+                    caption_text = f"`{cleaned_caption}`"
+
+                return {
+                    "success": True,
+                    "type": media_type,
+                    "file_path": file_path,
+                    "title": title,
+                    "caption": caption_text
+                }
+
+        except yt_dlp.DownloadError as e:
+            error_msg = str(e)
+            self._record_outcome(self.ytdlp_breaker, error_msg, "instagram:media")
+            if self._is_rate_limit_error(error_msg):
+                return {
+                    "success": False,
+                    "error": "Instagram rate-limit. Coba lagi 30-60 menit atau pake link lain."
+                }
+            logger.error(f"yt-dlp error: {e}")
+            return {
+                "success": False,
+                "error": "Ora iso download Instagram. Mungkin private atau dihapus.",
+                "permanent": self._is_fatal_error(error_msg),
+            }
+        except DownloadException as e:
+            self.ytdlp_breaker.record_success()
+            logger.warning(f"Instagram download rejected: {e}")
+            return {"success": False, "error": str(e), "permanent": isinstance(e, FileTooLargeException)}
         except Exception as e:
-            logger.error(f"General Instagram download error: {e}")
-            return {"success": False, "error": str(e)}
+            if is_transport_error(str(e)):
+                self.ytdlp_breaker.record_failure(str(e))
+            logger.error(f"Instagram download error: {e}")
+            return {
+                "success": False,
+                "error": f"Maaf kak, ada kendala saat download: {str(e)}"
+            }
 
     def cleanup_downloads(self):
-        """Clean up old download files (every file in our temp folder older than 1h)
-        """
+        """Expire old files and enforce the disk budget (the bot runs this on its job queue)"""
         try:
-            import time
-            for filename in os.listdir(self.download_dir):
-                file_path = os.path.join(self.download_dir, filename)
-                if os.path.isfile(file_path):
-                    file_age = os.path.getctime(file_path)
-                    if (time.time() - file_age) > 3600:  # 1 hour
-                        try:
-                            os.remove(file_path)
-                            logger.info(f"Cleaned up old file: {filename}")
-                        except Exception as ee:
-                            logger.error(f"Failed to remove {file_path}: {ee}")
+            self.store.sweep()
         except Exception as e:
             logger.error(f"Error cleaning up downloads: {e}")
@@ -0,0 +1,115 @@
+"""Resume interrupted yt-dlp downloads from the partial file left on disk"""
+import copy
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = '.part'
+
+
+def plan_download(ydl, info: Dict) -> Tuple[Optional[str], Optional[int]]:
+    """``(filename, expected_size)`` of the format yt-dlp is about to download.
+
+    Runs format selection on a deep copy of ``info`` (no network; yt-dlp
+    processes its argument in place and ``info`` may be shared), so the
+    partial file for that exact format can be checked before the download
+    starts. The size is only known for single-file formats with an exact
+    ``filesize``; merged and fragmented downloads report None.
+    """
+    planned = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    if not planned or planned.get('_type', 'video') != 'video':
+        return None, None
+    filename = ydl.prepare_filename(planned)
+    if planned.get('requested_formats') or planned.get('fragments'):
+        return filename, None
+    return filename, planned.get('filesize')
+
+
+class PartialDownloads:
+    """Checks the ``.part`` files yt-dlp resumes with HTTP Range requests.
+
+    Downloads are named ``<id>.<format_id>.<ext>`` and run with
+    ``continuedl``, so a retry or a re-request of the same link picks up
+    where the last attempt stopped instead of starting over. ``prepare``
+    runs before a download: a partial older than ``max_age`` or larger
+    than the expected file cannot belong to it and is deleted. ``verify``
+    runs after: a finished file whose size does not match the expected
+    one is deleted so the next attempt starts clean. Thread-safe, since
+    downloads run in the download pool.
+    """
+
+    def __init__(self, max_age: float = 1800):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.resumed = 0
+        self.resumed_bytes = 0
+        self.discarded = 0
+        self.corrupt = 0
+
+    def prepare(self, filename: Optional[str], expected_size: Optional[int] = None) -> int:
+        """Bytes the coming download can resume from (0 when starting fresh)"""
+        if not filename:
+            return 0
+        part = filename + PART_SUFFIX
+        try:
+            st = os.stat(part)
+        except OSError:
+            return 0
+
+        if time.time() - st.st_mtime > self.max_age:
+            reason = "stale"
+        elif expected_size and st.st_size > expected_size:
+            reason = f"larger than the expected {expected_size} bytes"
+        else:
+            if st.st_size:
+                with self._lock:
+                    self.resumed += 1
+                    self.resumed_bytes += st.st_size
+                logger.info(f"Resuming {os.path.basename(filename)} from {st.st_size / 1048576:.1f} MB")
+            return st.st_size
+
+        with self._lock:
+            self.discarded += 1
+        logger.info(f"Discarding partial {os.path.basename(part)}: {reason}")
+        self._unlink(part)
+        return 0
+
+    def verify(self, filename: str, expected_size: Optional[int] = None) -> bool:
+        """False (and the file deleted) when it is not the size yt-dlp announced"""
+        if not expected_size:
+            return True
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            return False
+        if size == expected_size:
+            return True
+        with self._lock:
+            self.corrupt += 1
+        logger.warning(
+            f"Download {os.path.basename(filename)} is {size} bytes, "
+            f"expected {expected_size}; deleting it"
+        )
+        self._unlink(filename)
+        return False
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to remove {path}: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "resumed": self.resumed,
+            "resumed_bytes": self.resumed_bytes,
+            "discarded": self.discarded,
+            "corrupt": self.corrupt,
+        }
@@ -1,26 +1,83 @@
 import os
-import requests
+import copy
+import asyncio
+import httpx
 import yt_dlp
 import logging
 import tempfile
 import re
+import math
 import time
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 from urllib.parse import urlparse, parse_qs
-from ..utils import sanitize_text
+from ..cache import TTLCache
+from ..circuit_breaker import CircuitBreaker, CircuitBreakers, is_transport_error
+from ..http_client import HttpClient
+from ..media_store import MediaStore, MemoryMedia
+from ..rate_governor import RateGovernor, RateLimitedException
+from ..utils import DownloadException, sanitize_text
+from .executor import DownloadExecutor
+from .formats import TELEGRAM_UPLOAD_LIMIT, FileTooLargeException, SizeAwareFormatSelector
+from .partials import PartialDownloads, plan_download
+from .tt_extract import TikTokPageExtractor
+from .ydl_pool import ProgressCallback, YDLPool
 
 logger = logging.getLogger(__name__)
 
+PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
 class TikTokDownloader:
-    def __init__(self):
+    def __init__(
+        self,
+        executor: Optional[DownloadExecutor] = None,
+        http: Optional[HttpClient] = None,
+        resolve_cache: Optional[TTLCache] = None,
+        carousel_concurrency: int = 4,
+        media_fetch_concurrency: int = 16,
+        ydl_max_uses: int = 50,
+        max_filesize: int = TELEGRAM_UPLOAD_LIMIT,
+        store: Optional[MediaStore] = None,
+        breakers: Optional[CircuitBreakers] = None,
+        governor: Optional[RateGovernor] = None,
+        partials: Optional[PartialDownloads] = None,
+    ):
+        # blocking yt-dlp work runs in the shared download pool
+        self.executor = executor or DownloadExecutor()
+        # keep-alive HTTP pool shared with the other downloaders
+        self.http = http or HttpClient()
+        # short link -> resolved URL, skips the redirect hop for hot links
+        self.resolve_cache = resolve_cache or TTLCache(maxsize=2048, ttl=6 * 3600)
+        # slideshow images fetched in parallel per post, and across all posts at once
+        self.carousel_concurrency = max(1, carousel_concurrency)
+        self._media_fetch_limit = asyncio.Semaphore(max(1, media_fetch_concurrency))
+
         # dedicated subfolder for TikTok downloads
         self.download_dir = os.path.join(tempfile.gettempdir(), "jawanese_bot_tiktok")
-        os.makedirs(self.download_dir, exist_ok=True)
+        # every file handed out is tracked against the shared disk budget
+        self.store = store or MediaStore()
+        self.store.register_dir(self.download_dir)
+        # fail fast while TikTok is rate-limiting one of the paths
+        self.breakers = breakers or CircuitBreakers()
+        self.ytdlp_breaker = self.breakers.get("tiktok:ytdlp")
+        self.oembed_breaker = self.breakers.get("tiktok:oembed")
+        self.web_breaker = self.breakers.get("tiktok:web")
+        # paces resolve / metadata / media calls so bursts do not earn us a 429
+        self.governor = governor or RateGovernor()
+        # interrupted downloads resume from their .part file on retry
+        self.partials = partials or PartialDownloads()
 
         # OPTIMIZED yt-dlp configuration
         self.ydl_opts = {
-            'outtmpl': os.path.join(self.download_dir, '%(id)s.%(ext)s'),
-            'format': 'best',  # Single best format
+            # keyed by media and format so a retry resumes the right partial file
+            'outtmpl': os.path.join(self.download_dir, '%(id)s.%(format_id)s.%(ext)s'),
+            'continuedl': True,
+            'nopart': False,
+            'format': SizeAwareFormatSelector(max_filesize),  # best single file under the upload limit
+            'max_filesize': max_filesize,
             'quiet': True,
             'no_warnings': True,
             'extractaudio': False,
@@ -30,6 +87,14 @@ class TikTokDownloader:
             'http_chunk_size': 10485760,
         }
 
+        # warm YoutubeDL instances, one per download worker
+        self.ydl_pool = YDLPool(
+            self.ydl_opts,
+            size=self.executor.max_workers,
+            max_uses=ydl_max_uses,
+            name="tiktok",
+        )
+
     def is_photo_url(self, url: str) -> bool:
         """Check if TikTok URL is a photo/slideshow"""
         return '/photo/' in url or 'photo' in url.lower()
@@ -64,12 +129,155 @@ class TikTokDownloader:
         ]
         return any(indicator.lower() in str(error_msg).lower() for indicator in fatal_indicators)
 
-    async def download_photo(self, url: str) -> Dict:
+    def _is_rate_limit_error(self, error_msg: str) -> bool:
+        """Detect TikTok throttling (HTTP 429, captcha/verify walls)"""
+        rate_limit_indicators = [
+            '429',
+            'Too Many Requests',
+            'rate limit',
+            'captcha',
+            'IP address is blocked',
+        ]
+        return any(indicator.lower() in str(error_msg).lower() for indicator in rate_limit_indicators)
+
+    def _record_outcome(self, breaker: CircuitBreaker, error_msg: str) -> None:
+        """Rate limits and timeouts trip the breaker; a deleted/private video still proves TikTok answered"""
+        if self._is_rate_limit_error(error_msg):
+            self.governor.throttled("tiktok:metadata")
+        if self._is_rate_limit_error(error_msg) or is_transport_error(error_msg):
+            breaker.record_failure(error_msg)
+        else:
+            breaker.record_success()
+
+    @staticmethod
+    def _circuit_open(breaker: CircuitBreaker) -> Dict:
+        minutes = max(1, math.ceil(breaker.retry_after / 60))
+        return {"success": False, "error": f"TikTok lagi rate-limit. Coba lagi sekitar {minutes} menit."}
+
+    async def scrape_slideshow(self, url: str) -> Optional[Dict]:
+        """Image list, author and caption of a photo post from its page
+
+        The page is streamed through TikTokPageExtractor and the connection
+        is dropped once the embedded state JSON has been read.
+        """
+        if not self.web_breaker.allow():
+            logger.info("TikTok page scraping skipped: circuit open")
+            return None
+        try:
+            await self.governor.acquire("tiktok:metadata")
+        except BaseException:
+            self.web_breaker.release()
+            raise
+        try:
+            extractor = TikTokPageExtractor()
+            async with self.http.stream("GET", url, headers=PAGE_HEADERS, timeout=10) as response:
+                if response.status_code == 429:
+                    self.governor.throttled("tiktok:metadata")
+                    self.web_breaker.record_failure(f"HTTP 429 {response.url}")
+                    logger.warning("TikTok page blocked: HTTP 429")
+                    return None
+                async for chunk in response.aiter_text():
+                    if extractor.feed(chunk):
+                        break
+            self.web_breaker.record_success()
+            self.governor.ok("tiktok:metadata")
+            logger.info(f"TikTok page scraped: read {extractor.chars_read} chars")
+            return extractor.slideshow(self.extract_video_id(url))
+
+        except httpx.TransportError as e:
+            self.web_breaker.record_failure(repr(e))
+            logger.error(f"Error scraping TikTok page: {e!r}")
+            return None
+        except Exception as e:
+            logger.error(f"Error scraping TikTok page: {e}")
+            return None
+        finally:
+            # no-op once an outcome was recorded; frees a cancelled half-open probe
+            self.web_breaker.release()
+
+    async def download_slideshow(self, url: str, progress: Optional[ProgressCallback] = None) -> Optional[Dict]:
+        """Every image of a photo slideshow, fetched concurrently, as a carousel result"""
+        slideshow = await self.scrape_slideshow(url)
+        if not slideshow:
+            return None
+
+        video_id = self.extract_video_id(url) or "unknown"
+        images = slideshow["images"]
+        post_limit = asyncio.Semaphore(self.carousel_concurrency)
+        fetched = 0
+
+        async def _fetch_image(i: int, img_url: str) -> Union[MemoryMedia, str, None]:
+            nonlocal fetched
+            image_path = os.path.join(self.download_dir, f"tiktok_{video_id}_part_{i+1}.jpg")
+            await self.governor.acquire("tiktok:media")
+            async with post_limit, self._media_fetch_limit:
+                try:
+                    response = await self.http.get(img_url, headers=PAGE_HEADERS, timeout=15)
+                    if response.status_code == 429:
+                        self.governor.throttled("tiktok:media")
+                    if response.status_code == 200:
+                        self.governor.ok("tiktok:media")
+                        # small images stay in memory, big ones go to disk
+                        return await self.store.keep(response.content, image_path)
+                except Exception as e:
+                    logger.error(f"Error downloading slideshow image {i+1}: {e}")
+                finally:
+                    fetched += 1
+                    if progress:
+                        progress("downloading", fetched * 100 / len(images))
+            return None
+
+        results = await asyncio.gather(
+            *(_fetch_image(i, img_url) for i, img_url in enumerate(images)),
+            return_exceptions=True,
+        )
+        refused = next((r for r in results if isinstance(r, RateLimitedException)), None)
+        if refused:
+            # no partial albums: drop what was fetched and report the backlog
+            for path in results:
+                self.store.release(path)
+            raise refused
+        files: List[Union[MemoryMedia, str]] = [
+            path for path in results if path and not isinstance(path, BaseException)
+        ]
+        if not files:
+            return None
+        logger.info(f"Downloaded TikTok slideshow {video_id}: {len(files)}/{len(images)} images")
+
+        caption_text = ""
+        if slideshow["caption"].strip():
+            cleaned_caption = sanitize_text(slideshow["caption"].strip())
+            if len(cleaned_caption) > 500:
+                cleaned_caption = cleaned_caption[:500] + "..."
+            caption_text = f"<i>{cleaned_caption}</i>"
+
+        return {
+            "success": True,
+            "type": "carousel",
+            "files": files,
+            "count": len(files),
+            "caption": caption_text
+        }
+
+    async def download_photo(self, url: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Download a TikTok photo post: the full slideshow, or the oEmbed cover as a fallback"""
+        try:
+            slideshow = await self.download_slideshow(url, progress)
+        except RateLimitedException as e:
+            return {"success": False, "error": str(e)}
+        if slideshow:
+            return slideshow
+        return await self.download_cover(url)
+
+    async def download_cover(self, url: str) -> Dict:
         """Download TikTok photo using oEmbed API"""
+        if not self.oembed_breaker.allow():
+            logger.warning("TikTok oEmbed skipped: circuit open")
+            return self._circuit_open(self.oembed_breaker)
         try:
             video_id = self.extract_video_id(url)
             if not video_id:
-                return {"success": False, "error": "Ora iso extract video ID"}
+                return {"success": False, "error": "Ora iso extract video ID", "permanent": True}
 
             # Convert photo URL to video URL for oEmbed
             if '/photo/' in url:
@@ -84,7 +292,14 @@ class TikTokDownloader:
 
             # Get oEmbed data with timeout
             oembed_api_url = f"https://www.tiktok.com/oembed?url={oembed_url}"
-            response = requests.get(oembed_api_url, timeout=10)
+            await self.governor.acquire("tiktok:metadata")
+            response = await self.http.get(oembed_api_url, timeout=10)
+            if response.status_code == 429:
+                self.governor.throttled("tiktok:metadata")
+                self.oembed_breaker.record_failure("HTTP 429 from oEmbed")
+            else:
+                self.governor.ok("tiktok:metadata")
+                self.oembed_breaker.record_success()
             response.raise_for_status()
 
             oembed_data = response.json()
@@ -94,17 +309,18 @@ class TikTokDownloader:
                 return {"success": False, "error": "Ora ketemu thumbnail URL"}
 
             # Download the image with timeout
-            img_response = requests.get(thumbnail_url, timeout=15)
+            await self.governor.acquire("tiktok:media")
+            img_response = await self.http.get(thumbnail_url, timeout=15)
+            if img_response.status_code == 429:
+                self.governor.throttled("tiktok:media")
             img_response.raise_for_status()
 
-            # Save to temporary file
+            # Keep it in memory (or spill to a temp file if it is large)
             filename = f"tiktok_photo_{video_id}.jpg"
-            file_path = os.path.join(self.download_dir, filename)
-
-            with open(file_path, 'wb') as f:
-                f.write(img_response.content)
-
-            logger.info(f"Downloaded TikTok photo: {file_path}")
+            file_path = await self.store.keep(
+                img_response.content, os.path.join(self.download_dir, filename)
+            )
+            logger.info(f"Downloaded TikTok photo: {filename} ({len(img_response.content)} bytes)")
 
             # Extract caption
             caption_text = ""
@@ -124,29 +340,57 @@ class TikTokDownloader:
                 "caption": caption_text
             }
 
-        except requests.RequestException as e:
+        except httpx.HTTPStatusError as e:
+            logger.error(f"oEmbed rejected photo: {e}")
+            if e.response.status_code in (400, 404):
+                # oEmbed answers 400/404 for deleted or invalid posts
+                return {"success": False, "error": "TikTok foto wis dihapus utawa link salah.", "permanent": True}
+            return {"success": False, "error": f"Network error: {str(e)}"}
+        except httpx.HTTPError as e:
+            if isinstance(e, httpx.TransportError):
+                self.oembed_breaker.record_failure(repr(e))
             logger.error(f"Network error downloading photo: {e}")
             return {"success": False, "error": f"Network error: {str(e)}"}
         except Exception as e:
             logger.error(f"Error downloading photo: {e}")
             return {"success": False, "error": str(e)}
-
-    async def download_video(self, url: str) -> Dict:
+        finally:
+            # invalid ID or refused token: the probe never reached oEmbed
+            self.oembed_breaker.release()
+
+    async def download_video(self, url: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Download TikTok video in the download pool so the event loop stays free"""
+        if not self.ytdlp_breaker.allow():
+            logger.warning("TikTok yt-dlp skipped: circuit open")
+            return self._circuit_open(self.ytdlp_breaker)
+        try:
+            # one extraction plus one media download
+            await self.governor.acquire("tiktok:metadata")
+            await self.governor.acquire("tiktok:media")
+            return await self.executor.run(self._download_video_sync, url, progress)
+        finally:
+            # the download records its own outcome; this frees a probe refused or cancelled early
+            self.ytdlp_breaker.release()
+
+    def _download_video_sync(self, url: str, progress: Optional[ProgressCallback] = None) -> Dict:
         """OPTIMIZED: Download TikTok video using yt-dlp with single format attempt"""
 
         try:
-            opts = self.ydl_opts.copy()
-
-            with yt_dlp.YoutubeDL(opts) as ydl:
+            with self.ydl_pool.checkout(progress) as ydl:
                 # Extract info first
                 try:
                     info = ydl.extract_info(url, download=False)
                 except yt_dlp.DownloadError as e:
                     error_msg = str(e)
                     # FAST-FAIL: Check for fatal errors
-                    if self._is_fatal_error(error_msg):
+                    if self._is_fatal_error(error_msg) and not self._is_rate_limit_error(error_msg):
+                        self.ytdlp_breaker.record_success()
                         logger.warning(f"Fatal TikTok error detected: {error_msg}")
-                        return {"success": False, "error": "TikTok video wis dihapus, private, atau link salah."}
+                        return {
+                            "success": False,
+                            "error": "TikTok video wis dihapus, private, atau link salah.",
+                            "permanent": True,
+                        }
                     raise
 
                 if not info:
@@ -155,11 +399,17 @@ class TikTokDownloader:
                 title = info.get('title', 'TikTok Video')
                 video_id = info.get('id', 'unknown')
 
-                # Download the video
-                ydl.download([url])
+                # Check the partial file of the chosen format, then download
+                # from the extracted info instead of extracting again; yt-dlp
+                # processes in place, so each pass gets clean extractor output
+                target, expected_size = plan_download(ydl, info)
+                self.partials.prepare(target, expected_size)
+                downloaded = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                self.ytdlp_breaker.record_success()
+                self.governor.ok("tiktok:metadata")
 
                 # Find the downloaded file
-                expected_filename = ydl.prepare_filename(info)
+                expected_filename = ydl.prepare_filename(downloaded or info)
 
                 if os.path.exists(expected_filename):
                     file_path = expected_filename
@@ -172,6 +422,10 @@ class TikTokDownloader:
                     else:
                         return {"success": False, "error": "File download ora ketemu."}
 
+                if file_path == target and not self.partials.verify(file_path, expected_size):
+                    return {"success": False, "error": "File download rusak, coba kirim link e maneh."}
+
+                self.store.track(file_path)
                 logger.info(f"Downloaded TikTok video: {file_path}")
 
                 # Extract caption
@@ -195,70 +449,95 @@ class TikTokDownloader:
 
         except yt_dlp.DownloadError as e:
             error_msg = str(e)
-            if self._is_fatal_error(error_msg):
-                return {"success": False, "error": "TikTok video wis dihapus atau diblokir."}
+            self._record_outcome(self.ytdlp_breaker, error_msg)
+            if self._is_fatal_error(error_msg) and not self._is_rate_limit_error(error_msg):
+                return {"success": False, "error": "TikTok video wis dihapus atau diblokir.", "permanent": True}
             logger.error(f"yt-dlp error: {e}")
             return {"success": False, "error": "Ora iso download TikTok video."}
+        except DownloadException as e:
+            self.ytdlp_breaker.record_success()
+            logger.warning(f"TikTok download rejected: {e}")
+            return {"success": False, "error": str(e), "permanent": isinstance(e, FileTooLargeException)}
         except Exception as e:
+            if is_transport_error(str(e)):
+                self.ytdlp_breaker.record_failure(str(e))
             logger.error(f"TikTok download error: {e}")
             return {
                 "success": False,
                 "error": f"Maaf kak, ada kendala saat download: {str(e)}"
             }
 
-    def resolve_url(self, url: str) -> str:
+    async def resolve_url(self, url: str) -> str:
         """Resolve shortened TikTok URLs with optimized timeout"""
         try:
             if 'vm.tiktok.com' in url or 'vt.tiktok.com' in url:
+                cached_url = self.resolve_cache.get(url)
+                if cached_url:
+                    return cached_url
+
                 headers = {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
-                response = requests.get(url, headers=headers, allow_redirects=True, timeout=10)
-                resolved_url = response.url
+                # Only the final redirect target matters, so the body is never read
+                await self.governor.acquire("tiktok:resolve")
+                async with self.http.stream("GET", url, headers=headers, timeout=10) as response:
+                    resolved_url = str(response.url)
+                    if response.status_code == 429:
+                        self.governor.throttled("tiktok:resolve")
+                    else:
+                        self.governor.ok("tiktok:resolve")
                 logger.info(f"Resolved short URL: {url} -> {resolved_url}")
+                # only cache real video pages, a notfound redirect may be transient
+                if resolved_url != url and 'notfound' not in resolved_url.lower():
+                    self.resolve_cache.set(url, resolved_url)
                 return resolved_url
             return url
+        except RateLimitedException:
+            raise
         except Exception as e:
             logger.error(f"Error resolving URL: {e}")
             return url
 
-    async def download(self, url: str) -> Dict:
-        """OPTIMIZED main download method"""
+    async def download(self, url: str, progress: Optional[ProgressCallback] = None) -> Dict:
+        """OPTIMIZED main download method
+
+        ``progress`` is called with the current stage (and the download
+        percentage) so the bot can keep the user's message up to date.
+        """
         try:
             logger.info(f"Starting TikTok download: {url}")
+            if progress:
+                progress("resolving", None)
 
             # Resolve shortened URLs first
-            resolved_url = self.resolve_url(url)
+            resolved_url = await self.resolve_url(url)
             logger.info(f"Using URL for download: {resolved_url}")
 
             # FAST-FAIL: Check if resolution failed to notfound page
             if 'notfound' in resolved_url.lower() or resolved_url == url and ('vm.tiktok.com' in url or 'vt.tiktok.com' in url):
                 logger.warning(f"URL resolution failed or video not found")
-                return {"success": False, "error": "Link TikTok salah, wis dihapus, atau expired."}
+                return {
+                    "success": False,
+                    "error": "Link TikTok salah, wis dihapus, atau expired.",
+                    # a failed resolve is worth retrying, a notfound redirect is not
+                    "permanent": 'notfound' in resolved_url.lower(),
+                }
 
             # Determine if it's photo or video
             if self.is_photo_url(resolved_url):
-                return await self.download_photo(resolved_url)
+                return await self.download_photo(resolved_url, progress)
             else:
-                return await self.download_video(resolved_url)
+                return await self.download_video(resolved_url, progress)
 
+        except RateLimitedException as e:
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"General download error: {e}")
             return {"success": False, "error": f"Ora iso download TikTok. Error: {str(e)}"}
 
     def cleanup_downloads(self):
-        """Clean up old download files (remove anything in our subfolder older than an hour)"""
+        """Expire old files and enforce the disk budget (the bot runs this on its job queue)"""
         try:
-            import time
-            for filename in os.listdir(self.download_dir):
-                file_path = os.path.join(self.download_dir, filename)
-                if os.path.isfile(file_path):
-                    file_age = os.path.getctime(file_path)
-                    if (time.time() - file_age) > 3600:
-                        try:
-                            os.remove(file_path)
-                            logger.info(f"Cleaned up old file: {filename}")
-                        except Exception as ee:
-                            logger.error(f"Failed to remove {file_path}: {ee}")
+            self.store.sweep()
         except Exception as e:
             logger.error(f"Error cleaning up downloads: {e}")
@@ -0,0 +1,98 @@
+"""Incremental TikTok page extractor for photo slideshows.
+
+TikTok embeds the post as JSON in a ``<script>`` with the id
+``__UNIVERSAL_DATA_FOR_REHYDRATION__`` (``SIGI_STATE`` on older
+pages). The page is fed chunk by chunk and reading stops as soon as that
+script has closed, so the rest of the HTML is never downloaded.
+"""
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_SCRIPT = re.compile(
+    r'<script[^>]*\bid="(__UNIVERSAL_DATA_FOR_REHYDRATION__|SIGI_STATE)"[^>]*>', re.IGNORECASE,
+)
+SCRIPT_END = re.compile(r'</script\s*>', re.IGNORECASE)
+
+# enough to hold a partial opening tag at a chunk boundary
+_TAIL = 256
+
+
+class TikTokPageExtractor:
+    """Feed decoded HTML chunks; ``feed`` returns True once the state JSON is read"""
+
+    def __init__(self, max_chars: int = 4 * 1024 * 1024):
+        self.max_chars = max_chars
+        self.chars_read = 0
+        self.state: Optional[Dict] = None
+        self._buf = ''
+        self._in_script = False
+        # where to resume looking for </script> while the JSON spans chunks
+        self._close_from = 0
+        self._failed = False
+
+    @property
+    def done(self) -> bool:
+        return self.state is not None or self._failed or self.chars_read >= self.max_chars
+
+    def feed(self, chunk: str) -> bool:
+        self.chars_read += len(chunk)
+        self._buf += chunk
+        if not self._in_script:
+            match = STATE_SCRIPT.search(self._buf)
+            if not match:
+                self._buf = self._buf[-_TAIL:]
+                return self.done
+            self._in_script = True
+            self._buf = self._buf[match.end():]
+
+        end = SCRIPT_END.search(self._buf, self._close_from)
+        if not end:
+            self._close_from = max(0, len(self._buf) - len('</script '))
+        else:
+            try:
+                self.state = json.loads(self._buf[:end.start()])
+            except ValueError as e:
+                logger.warning(f"TikTok page state is not valid JSON: {e}")
+                self._failed = True
+            self._buf = ''
+        return self.done
+
+    def item(self, video_id: Optional[str] = None) -> Optional[Dict]:
+        """The post's item struct from either state layout"""
+        if not isinstance(self.state, dict):
+            return None
+        scope = self.state.get('__DEFAULT_SCOPE__')
+        if isinstance(scope, dict):
+            detail = scope.get('webapp.video-detail') or {}
+            item = (detail.get('itemInfo') or {}).get('itemStruct')
+            if isinstance(item, dict):
+                return item
+        items = self.state.get('ItemModule')
+        if isinstance(items, dict) and items:
+            return items.get(video_id) or next(iter(items.values()))
+        return None
+
+    def slideshow(self, video_id: Optional[str] = None) -> Optional[Dict]:
+        """``{"images", "author", "caption"}`` for a photo post, else None"""
+        item = self.item(video_id)
+        if not item:
+            return None
+        images: List[str] = []
+        for image in (item.get('imagePost') or {}).get('images') or []:
+            urls = (image.get('imageURL') or {}).get('urlList') or []
+            # Telegram wants JPEG photos; the list may also offer webp/heic variants
+            jpeg = [u for u in urls if '.jpeg' in u or '.jpg' in u]
+            if urls:
+                images.append((jpeg or urls)[0])
+        if not images:
+            return None
+        author = item.get('author')
+        return {
+            "images": images,
+            "author": author.get('uniqueId') if isinstance(author, dict) else author,
+            "caption": item.get('desc') or (item.get('imagePost') or {}).get('title') or "",
+        }
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+import yt_dlp
+
+from ..utils import DownloadException
+
+logger = logging.getLogger(__name__)
+
+# progress callback: stage ("resolving", "downloading", "uploading") and percent if known
+ProgressCallback = Callable[[str, Optional[float]], None]
+
+
+class YDLPool:
+    """Warm, reusable ``yt_dlp.YoutubeDL`` instances for one platform.
+
+    Building a YoutubeDL re-initialises extractors, the cookie jar and the
+    HTTP handlers, so instances are built once from the downloader's
+    ``ydl_opts`` and checked out per job. An instance is recycled after
+    ``max_uses`` jobs, and discarded right away if a job fails with
+    anything other than a regular ``DownloadError``.
+
+    Every instance shares one ``progress_hooks`` entry that forwards
+    yt-dlp's download progress to the callback passed to ``checkout`` on
+    the current thread.
+    """
+
+    def __init__(self, opts: Dict, size: int = 4, max_uses: int = 50, name: str = "ydl"):
+        self.opts = dict(opts)
+        self.opts['progress_hooks'] = list(self.opts.get('progress_hooks', [])) + [self._progress_hook]
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.name = name
+        self._idle: "queue.LifoQueue[yt_dlp.YoutubeDL]" = queue.LifoQueue()
+        self._uses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+
+    def _build(self) -> yt_dlp.YoutubeDL:
+        ydl = yt_dlp.YoutubeDL(dict(self.opts))
+        with self._lock:
+            self._uses[id(ydl)] = 0
+            self.created += 1
+        return ydl
+
+    def warm(self) -> None:
+        """Pre-build instances up to the pool size (call from a worker thread)"""
+        while self._idle.qsize() < self.size:
+            self._idle.put(self._build())
+        logger.info(f"{self.name} pool warmed with {self.size} YoutubeDL instances")
+
+    def _progress_hook(self, d: Dict) -> None:
+        progress = getattr(self._local, 'progress', None)
+        if progress is None or d.get('status') != 'downloading':
+            return
+        try:
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            done = d.get('downloaded_bytes')
+            percent = min(100.0, done * 100 / total) if total and done is not None else None
+            progress('downloading', percent)
+        except Exception as e:
+            # a broken progress message must never fail the download
+            logger.debug(f"{self.name} pool: progress callback failed: {e}")
+
+    @contextmanager
+    def checkout(self, progress: Optional[ProgressCallback] = None) -> Iterator[yt_dlp.YoutubeDL]:
+        try:
+            ydl = self._idle.get_nowait()
+        except queue.Empty:
+            ydl = self._build()
+
+        healthy = True
+        self._local.progress = progress
+        try:
+            yield ydl
+        except (yt_dlp.DownloadError, DownloadException):
+            # normal extraction/download failure, the instance itself is fine
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self._local.progress = None
+            self._checkin(ydl, healthy)
+
+    def _checkin(self, ydl: yt_dlp.YoutubeDL, healthy: bool) -> None:
+        with self._lock:
+            uses = self._uses.get(id(ydl), 0) + 1
+            self._uses[id(ydl)] = uses
+
+        if not healthy:
+            self.discarded += 1
+            self._close(ydl)
+        elif uses >= self.max_uses or self._idle.qsize() >= self.size:
+            self.recycled += 1
+            self._close(ydl)
+        else:
+            self._idle.put(ydl)
+
+    def _close(self, ydl: yt_dlp.YoutubeDL) -> None:
+        with self._lock:
+            self._uses.pop(id(ydl), None)
+        try:
+            ydl.close()
+        except Exception as e:
+            logger.warning(f"{self.name} pool: error closing YoutubeDL: {e}")
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict:
+        return {
+            "idle": self._idle.qsize(),
+            "created": self.created,
+            "recycled": self.recycled,
+            "discarded": self.discarded,
+        }
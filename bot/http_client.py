@@ -0,0 +1,83 @@
+"""Shared async HTTP client for downloader network calls"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"
+)
+
+
+class HttpClient:
+    """One keep-alive connection pool for the whole process.
+
+    Wraps a lazily created ``httpx.AsyncClient`` (HTTP/2 when ``h2`` is
+    installed) and caps concurrent requests per host so a burst of CDN
+    fetches cannot starve short-link resolution or oEmbed calls.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 15.0,
+        max_connections: int = 50,
+        max_per_host: int = 8,
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_per_host = max(1, max_per_host)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                follow_redirects=True,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 10.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+                headers={"User-Agent": DEFAULT_USER_AGENT},
+            )
+            logger.info(f"HTTP client ready (http2={HTTP2_AVAILABLE}, max_connections={self.max_connections})")
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or ""
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return sem
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET with the body fully read"""
+        async with self._host_limit(url):
+            return await self.client.get(url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Streamed request; the body is only read if the caller iterates it"""
+        async with self._host_limit(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -4,25 +4,39 @@ import os
 import re
 import sys
 import time
+from collections import defaultdict
 from datetime import datetime, timedelta
 
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.error import NetworkError, TimedOut
+from telegram import (
+    Bot, InlineKeyboardButton, InlineKeyboardMarkup,
+    InputMediaPhoto, InputMediaVideo, Update,
+)
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
 from telegram.ext import (
     Application, CallbackQueryHandler, CommandHandler,
     ContextTypes, MessageHandler, filters,
 )
 
+from bot.admission import AdmissionController
 from bot.ai_monitor import (
     GroqMonitor,
     get_pending_fix, remove_pending_fix,
     save_rollback, get_rollback, remove_rollback, list_rollbacks,
 )
 from bot.config import Config
+from bot.cache import TTLCache
+from bot.circuit_breaker import CircuitBreakers
+from bot.coalescer import RequestCoalescer
 from bot.constants import MESSAGES, VIP_PACKAGES
 from bot.database import Database
-from bot.downloaders import InstagramDownloader, TikTokDownloader
+from bot.downloaders import DownloadExecutor, InstagramDownloader, PartialDownloads, TikTokDownloader
+from bot.http_client import HttpClient
+from bot.media_store import MediaStore, MemoryMedia
 from bot.payment import SaweriaAPI
+from bot.progress import BatchProgress, EditThrottle, LiveProgress
+from bot.rate_governor import RateGovernor, parse_limits
+from bot.scheduler import DownloadScheduler
+from bot.update_processor import PerUserUpdateProcessor
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
@@ -34,6 +48,11 @@ logger = logging.getLogger(__name__)
 TIKTOK_RE    = re.compile(r"https?://(?:www\.)?(?:vm\.|vt\.)?tiktok\.com/\S+")
 INSTAGRAM_RE = re.compile(r"https?://(?:www\.)?instagram\.com/\S+")
 
+MEDIA_GROUP_LIMIT = 10  # batas item per send_media_group di Bot API
+
+# label status circuit breaker di statistik admin
+_BREAKER_LABELS = {"closed": "🟢 normal", "open": "🔴 terbuka", "half_open": "🟡 uji coba"}
+
 
 # ── Keyboard builders ───────────────────────────────────────────────────────────
 
@@ -95,14 +114,106 @@ class DownloaderBot:
     def __init__(self):
         self.config    = Config()
         self.db        = Database(self.config.DATABASE_PATH)
-        self.tiktok    = TikTokDownloader()
-        self.instagram = InstagramDownloader()
+        self.executor  = DownloadExecutor(self.config.DOWNLOAD_WORKERS)
+        self.http      = HttpClient(
+            timeout=self.config.HTTP_TIMEOUT,
+            max_connections=self.config.HTTP_MAX_CONNECTIONS,
+            max_per_host=self.config.HTTP_MAX_PER_HOST,
+        )
+        self.store     = MediaStore(
+            max_bytes=self.config.MEDIA_STORE_MAX_MB * 1024 * 1024,
+            high_watermark=self.config.MEDIA_STORE_HIGH_WATERMARK,
+            low_watermark=self.config.MEDIA_STORE_LOW_WATERMARK,
+            max_age=self.config.MEDIA_STORE_MAX_AGE_MINUTES * 60,
+            memory_threshold=self.config.INMEMORY_MEDIA_MAX_KB * 1024,
+            partial_max_age=self.config.PARTIAL_MAX_AGE_MINUTES * 60,
+            dedup=self.config.MEDIA_DEDUP,
+        )
+        # Upload yang dilewati karena isi filenya sudah punya file_id (repost)
+        self.content_hits = 0
+        # Download yang putus dilanjutkan dari file .part-nya, dibagi kedua downloader
+        self.partials  = PartialDownloads(max_age=self.config.PARTIAL_MAX_AGE_MINUTES * 60)
+        # Satu breaker per platform/jalur (html, yt-dlp, oEmbed), dibagi kedua downloader
+        self.breakers  = CircuitBreakers(
+            threshold=self.config.BREAKER_THRESHOLD,
+            window=self.config.BREAKER_WINDOW_SECONDS,
+            cooldown=self.config.BREAKER_COOLDOWN_SECONDS,
+            max_cooldown=self.config.BREAKER_MAX_COOLDOWN_MINUTES * 60,
+        )
+        # Token bucket per platform/kelas endpoint, melambat otomatis saat kena 429
+        self.governor  = RateGovernor(
+            limits=parse_limits(self.config.RATE_LIMITS),
+            max_wait=self.config.RATE_MAX_WAIT_SECONDS,
+        )
+        self.resolve_cache = TTLCache(
+            maxsize=self.config.RESOLVE_CACHE_SIZE,
+            ttl=self.config.RESOLVE_CACHE_TTL_HOURS * 3600,
+            namespace="tiktok_resolve",
+            store=self.db if self.config.RESOLVE_CACHE_PERSIST else None,
+        )
+        # Link mati (dihapus/private/kebesaran): error-nya diingat supaya kiriman ulang langsung dijawab
+        self.dead_links = TTLCache(
+            maxsize=self.config.DEAD_LINK_CACHE_SIZE,
+            ttl=self.config.DEAD_LINK_CACHE_TTL_MINUTES * 60,
+            namespace="dead_links",
+            store=self.db if self.config.DEAD_LINK_CACHE_PERSIST else None,
+        )
+        self.tiktok    = TikTokDownloader(
+            executor=self.executor,
+            http=self.http,
+            resolve_cache=self.resolve_cache,
+            carousel_concurrency=self.config.CAROUSEL_CONCURRENCY,
+            media_fetch_concurrency=self.config.MEDIA_FETCH_CONCURRENCY,
+            ydl_max_uses=self.config.YDL_MAX_USES,
+            max_filesize=self.config.MAX_UPLOAD_MB * 1024 * 1024,
+            store=self.store,
+            breakers=self.breakers,
+            governor=self.governor,
+            partials=self.partials,
+        )
+        self.instagram = InstagramDownloader(
+            executor=self.executor,
+            http=self.http,
+            carousel_concurrency=self.config.CAROUSEL_CONCURRENCY,
+            media_fetch_concurrency=self.config.MEDIA_FETCH_CONCURRENCY,
+            meta_cache=TTLCache(maxsize=256, ttl=self.config.IG_META_CACHE_TTL_MINUTES * 60),
+            ydl_max_uses=self.config.YDL_MAX_USES,
+            max_filesize=self.config.MAX_UPLOAD_MB * 1024 * 1024,
+            store=self.store,
+            breakers=self.breakers,
+            governor=self.governor,
+            partials=self.partials,
+            hedge_delay=self.config.IG_HEDGE_DELAY_SECONDS if self.config.IG_HEDGE_DELAY_SECONDS >= 0 else None,
+        )
         self.saweria   = SaweriaAPI(
             username=self.config.SAWERIA_USERNAME,
             user_id=self.config.SAWERIA_USER_ID,
         )
+        self.coalescer = RequestCoalescer()
+        # Antrian download: jalur admin/VIP/gratis berbobot, adil antar user
+        self.scheduler = DownloadScheduler(
+            max_active=self.config.MAX_ACTIVE_DOWNLOADS,
+            weights=self.config.SCHEDULER_WEIGHTS,
+            per_user_active=self.config.PER_USER_ACTIVE_DOWNLOADS,
+        )
+        # Tolak download gratis baru saat bot kelebihan beban (VIP/admin tetap dilayani)
+        self.admission = AdmissionController(
+            self.coalescer, self.scheduler, self.store,
+            max_in_flight=self.config.SHED_MAX_IN_FLIGHT,
+            max_queued=self.config.SHED_MAX_QUEUED,
+            max_disk_fraction=self.config.SHED_MAX_DISK_FRACTION,
+            max_rss_bytes=self.config.SHED_MAX_RSS_MB * 1024 * 1024,
+        )
+        # Anggaran edit pesan progres, dibagi semua download yang sedang jalan
+        self.edit_throttle = EditThrottle(
+            rate=self.config.PROGRESS_EDITS_PER_SECOND,
+            min_interval=self.config.PROGRESS_EDIT_INTERVAL,
+        )
+        # Kuota yang sedang dipakai pesan yang masih diproses (belum tercatat di DB)
+        self._reserved: defaultdict[int, int] = defaultdict(int)
         self._polling_tasks: dict[str, asyncio.Task] = {}
         self.monitor: GroqMonitor | None = None
+        self.update_processor: PerUserUpdateProcessor | None = None
 
     # ── Helpers ─────────────────────────────────────────────────────────────────
 
@@ -192,16 +303,19 @@ class DownloaderBot:
         text    = update.message.text
         user_id = update.effective_user.id
 
-        tiktok_match    = TIKTOK_RE.search(text)
-        instagram_match = INSTAGRAM_RE.search(text)
-
-        if not tiktok_match and not instagram_match:
+        links = self._extract_links(text)
+        if not links:
             return
 
-        url      = (tiktok_match or instagram_match).group()
-        platform = "tiktok" if tiktok_match else "instagram"
         is_vip   = self.db.is_user_vip(user_id)
         is_admin = user_id in self.config.ADMIN_IDS
+        tier     = "admin" if is_admin else "vip" if is_vip else "free"
+
+        # Admission control — cek paling awal supaya saat sibuk tidak ada kerja sia-sia
+        reason = self.admission.shed_reason(tier)
+        if reason:
+            await update.message.reply_text(MESSAGES["busy"], parse_mode="HTML")
+            return
 
         # Channel membership
         if not is_vip and not is_admin:
@@ -213,100 +327,378 @@ class DownloaderBot:
                 )
                 return
 
-        # Daily limit
+        # Daily limit — kuota dicadangkan sekaligus untuk semua link di pesan ini
+        skipped = 0
         if not is_admin:
             limit   = self.config.VIP_DAILY_LIMIT if is_vip else self.config.FREE_DAILY_LIMIT
-            current = self.db.get_daily_downloads(user_id)
+            current = self.db.get_daily_downloads(user_id) + self._reserved[user_id]
             if current >= limit:
                 await update.message.reply_text(
                     MESSAGES["daily_limit"].format(current=current, limit=limit),
                     parse_mode="HTML",
                 )
                 return
+            skipped = max(0, len(links) - (limit - current))
+            links   = links[:len(links) - skipped]
+            self._reserved[user_id] += len(links)
+
+        # Download jalan di background: slot update & lock per user langsung lepas,
+        # jadi /start, menu & callback pembayaran tidak ikut antri di belakang download
+        context.application.create_task(
+            self._run_links(update, context, links, user_id, tier, skipped, reserved=not is_admin),
+            update=update,
+        )
 
+    async def _run_links(self, update: Update, context: ContextTypes.DEFAULT_TYPE, links: list,
+                         user_id: int, tier: str, skipped: int, reserved: bool):
+        """Jalankan download link yang sudah lolos cek, lalu lepas kuota yang dicadangkan."""
+        try:
+            if len(links) == 1:
+                await self._handle_single(update, context, *links[0], user_id, tier)
+            else:
+                await self._handle_batch(update, context, links, user_id, tier, skipped)
+        finally:
+            if reserved:
+                self._reserved[user_id] -= len(links)
+                if self._reserved[user_id] <= 0:
+                    del self._reserved[user_id]
+
+    def _extract_links(self, text: str) -> list[tuple[str, str]]:
+        """Semua link TikTok/Instagram di pesan (urut, tanpa duplikat, maks MAX_LINKS_PER_MESSAGE)."""
+        found = sorted(
+            [(m.start(), "tiktok", m.group()) for m in TIKTOK_RE.finditer(text)]
+            + [(m.start(), "instagram", m.group()) for m in INSTAGRAM_RE.finditer(text)]
+        )
+        links, seen = [], set()
+        for _, platform, url in found:
+            # ?igsh= / ?is_from_webapp= cuma tracking, link yang sama tetap satu download
+            key = self._link_key(url)
+            if key in seen:
+                continue
+            seen.add(key)
+            links.append((platform, url))
+        return links[:self.config.MAX_LINKS_PER_MESSAGE]
+
+    @staticmethod
+    def _link_key(url: str) -> str:
+        return url.split("#")[0].split("?")[0].rstrip("/")
+
+    async def _handle_single(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                             platform: str, url: str, user_id: int, tier: str):
         proc_msg = await update.message.reply_text(MESSAGES["processing"], parse_mode="HTML")
+        live     = LiveProgress(self.edit_throttle, proc_msg)
 
         try:
-            if platform == "tiktok":
-                await self._send_tiktok(update, context, url, user_id, proc_msg)
-            else:
-                await self._send_instagram(update, context, url, user_id, proc_msg)
-        except Exception as e:
-            logger.error(f"Download error: {e}")
+            outcome = await self._process_link(
+                context.bot, update.effective_chat.id, platform, url, user_id, tier,
+                live.queued, live.report,
+            )
+        finally:
+            await live.close()
+
+        if not outcome["success"]:
             await proc_msg.edit_text(
-                MESSAGES["download_error"].format(error=str(e)),
+                MESSAGES["download_error"].format(error=outcome["error"]),
                 parse_mode="HTML",
             )
-
-    async def _send_tiktok(self, update, context, url, user_id, proc_msg):
-        result = await self.tiktok.download(url)
-        if not result["success"]:
+        elif outcome["type"] == "carousel":
             await proc_msg.edit_text(
-                MESSAGES["download_error"].format(error=result["error"]),
+                MESSAGES["carousel_success"].format(count=outcome["count"]),
                 parse_mode="HTML",
             )
-            return
+        else:
+            await proc_msg.delete()
 
-        self.db.record_download(user_id)
-        caption = self._clean_caption(result.get("caption", "")) or MESSAGES["download_success"]
-        chat_id = update.effective_chat.id
+    async def _handle_batch(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            links: list, user_id: int, tier: str, skipped: int):
+        """Banyak link: satu pesan progres, download paralel terbatas, hasil dikirim begitu siap."""
+        chat_id  = update.effective_chat.id
+        limit    = asyncio.Semaphore(self.config.MESSAGE_LINK_CONCURRENCY)
+        progress = BatchProgress([platform for platform, _ in links], self.edit_throttle, skipped)
+        progress.message = await update.message.reply_text(progress.render(), parse_mode="HTML")
+
+        async def _one(index: int, platform: str, url: str):
+            async with limit:
+                outcome = await self._process_link(
+                    context.bot, chat_id, platform, url, user_id, tier,
+                    lambda position: progress.queued(index, position),
+                    lambda stage, percent=None: progress.report(index, stage, percent),
+                )
+            if outcome["success"]:
+                await progress.done(index, outcome["count"])
+            else:
+                await progress.failed(index, outcome["error"])
 
-        if result["type"] == "photo":
-            await context.bot.send_photo(chat_id=chat_id, photo=result["file_path"],
-                                         caption=caption, parse_mode="HTML")
-        else:
-            with open(result["file_path"], "rb") as f:
-                await context.bot.send_video(chat_id=chat_id, video=f,
-                                             caption=caption, parse_mode="HTML")
+        try:
+            await asyncio.gather(*(_one(i, platform, url) for i, (platform, url) in enumerate(links)))
+        finally:
+            await progress.close()
 
-        _safe_delete(result["file_path"])
-        await proc_msg.delete()
+    async def _process_link(self, bot: Bot, chat_id: int, platform: str, url: str,
+                            user_id: int, tier: str, on_position=None, progress=None) -> dict:
+        downloader = self.tiktok if platform == "tiktok" else self.instagram
+        try:
+            return await self._send_media(
+                platform, downloader, bot, chat_id, url, user_id, tier, on_position, progress,
+            )
+        except Exception as e:
+            logger.error(f"Download error: {e}")
+            return {"success": False, "error": str(e)}
 
-    async def _send_instagram(self, update, context, url, user_id, proc_msg):
-        result = await self.instagram.download(url)
-        if not result["success"]:
-            await proc_msg.edit_text(
-                MESSAGES["download_error"].format(error=result["error"]),
-                parse_mode="HTML",
+    async def _media_key(self, platform: str, url: str) -> tuple[str | None, str]:
+        """Kunci kanonik media (ID video TikTok / shortcode Instagram) + URL final untuk download."""
+        if platform == "tiktok":
+            url      = await self.tiktok.resolve_url(url)
+            media_id = self.tiktok.extract_video_id(url)
+        else:
+            # Story berubah-ubah per user, tidak di-cache
+            media_id = None if "/stories/" in url else self.instagram.extract_post_id(url)
+        return (f"{platform}:{media_id}" if media_id else None), url
+
+    async def _send_cached(self, bot: Bot, chat_id: int, media_key: str | None, user_id: int) -> dict | None:
+        """Kirim ulang media dari cache file_id. Kembalikan entri cache jika berhasil."""
+        if not media_key:
+            return None
+        entry = self.db.get_cached_media(media_key, self.config.MEDIA_CACHE_TTL_HOURS)
+        if not entry:
+            return None
+        try:
+            if entry["type"] == "carousel":
+                sent = await self._send_album(
+                    bot, chat_id,
+                    [(item["type"], item["file_id"]) for item in entry["items"]],
+                    entry["items"][0].get("caption"),
+                )
+                if None in sent:
+                    raise ValueError("sebagian item album gagal dikirim")
+            else:
+                for item in entry["items"]:
+                    await self._upload(bot, chat_id, item["type"], item["file_id"], item.get("caption"))
+        except Exception as e:
+            logger.warning(f"Cache file_id {media_key} tidak valid, download ulang: {e}")
+            self.db.delete_cached_media(media_key)
+            return None
+
+        for _ in entry["items"]:
+            self.db.record_download(user_id)
+        logger.info(f"Cache hit {media_key} — dikirim tanpa download")
+        return entry
+
+    async def _upload(self, bot: Bot, chat_id: int, kind: str, media, caption: str | None):
+        """Kirim satu media; `media` bisa path lokal, MemoryMedia, atau file_id Telegram."""
+        filename = None
+        if isinstance(media, MemoryMedia):
+            media, filename = media.data, media.filename
+        if kind == "video":
+            if isinstance(media, str) and os.path.exists(media):
+                with open(media, "rb") as f:
+                    return await bot.send_video(chat_id=chat_id, video=f,
+                                                caption=caption, parse_mode="HTML")
+            return await bot.send_video(chat_id=chat_id, video=media, filename=filename,
+                                        caption=caption, parse_mode="HTML")
+        return await bot.send_photo(chat_id=chat_id, photo=media, filename=filename,
+                                    caption=caption, parse_mode="HTML")
+
+    async def _send_album(self, bot: Bot, chat_id: int, items: list, caption: str | None) -> list:
+        """Kirim banyak media sebagai album (maks 10 per grup), caption di item pertama.
+
+        `items` berisi pasangan (kind, media). Jika satu grup gagal, item di grup itu
+        dikirim satu per satu. Kembalikan item terkirim (None untuk yang gagal).
+        """
+        sent = []
+        for start in range(0, len(items), MEDIA_GROUP_LIMIT):
+            chunk    = items[start:start + MEDIA_GROUP_LIMIT]
+            captions = [caption if start == 0 and i == 0 else None for i in range(len(chunk))]
+
+            if len(chunk) > 1:
+                msgs = await self._send_group(bot, chat_id, chunk, captions)
+                if msgs:
+                    sent.extend(
+                        self._sent_item(kind, msg, cap)
+                        for (kind, _), msg, cap in zip(chunk, msgs, captions)
+                    )
+                    continue
+
+            for (kind, m), cap in zip(chunk, captions):
+                try:
+                    msg = await self._upload(bot, chat_id, kind, m, cap)
+                    sent.append(self._sent_item(kind, msg, cap))
+                except Exception as e:
+                    logger.error(f"Error kirim item album {len(sent) + 1}: {e}")
+                    sent.append(None)
+        return sent
+
+    async def _send_group(self, bot: Bot, chat_id: int, chunk: list, captions: list) -> list | None:
+        media = [
+            (InputMediaVideo if kind == "video" else InputMediaPhoto)(
+                media=m.data if isinstance(m, MemoryMedia) else m,
+                filename=m.filename if isinstance(m, MemoryMedia) else None,
+                caption=cap, parse_mode="HTML",
             )
+            for (kind, m), cap in zip(chunk, captions)
+        ]
+        for attempt in range(2):
+            try:
+                return list(await bot.send_media_group(chat_id=chat_id, media=media))
+            except RetryAfter as e:
+                # Flood control: tunggu sekali lalu coba lagi sebelum fallback
+                if attempt:
+                    break
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.warning(f"Album gagal dikirim, fallback satu per satu: {e}")
+                break
+        return None
+
+    @staticmethod
+    def _media_kind(media) -> str:
+        name = media.filename if isinstance(media, MemoryMedia) else media
+        return "video" if name.endswith((".mp4", ".mov", ".avi")) else "photo"
+
+    @staticmethod
+    def _sent_item(kind: str, msg, caption: str | None) -> dict | None:
+        if kind == "video" and msg.video:
+            return {"type": "video", "file_id": msg.video.file_id, "caption": caption}
+        if kind == "photo" and msg.photo:
+            return {"type": "photo", "file_id": msg.photo[-1].file_id, "caption": caption}
+        return None
+
+    @staticmethod
+    def _media_size(media) -> int:
+        if isinstance(media, MemoryMedia):
+            return len(media)
+        if isinstance(media, str) and os.path.exists(media):
+            return os.path.getsize(media)
+        return 0
+
+    def _cache_sent(self, media_key: str | None, media_type: str, items: list, paths: list) -> None:
+        self._cache_content(items, paths)
+        if not media_key or not items or None in items:
             return
+        size = sum(self._media_size(p) for p in paths)
+        try:
+            self.db.save_cached_media(media_key, media_type, items, size_bytes=size)
+        except Exception as e:
+            logger.warning(f"Gagal simpan cache {media_key}: {e}")
+
+    def _content_key(self, media) -> str | None:
+        """Kunci cache per isi file (SHA-256), sama untuk repost dengan ID berbeda."""
+        digest = self.store.digest(media)
+        return f"content:{digest}" if digest else None
+
+    def _cache_content(self, items: list, paths: list) -> None:
+        """Simpan file_id per isi file, tanpa caption (caption ikut post masing-masing)."""
+        for item, path in zip(items, paths):
+            content_key = self._content_key(path)
+            if not item or not content_key:
+                continue
+            try:
+                self.db.save_cached_media(content_key, item["type"], [dict(item, caption=None)],
+                                          size_bytes=self._media_size(path))
+            except Exception as e:
+                logger.warning(f"Gagal simpan cache {content_key}: {e}")
+
+    def _known_file_id(self, kind: str, media) -> str | None:
+        """file_id Telegram yang sudah ada untuk isi file ini (repost dengan ID lain)."""
+        content_key = self._content_key(media)
+        if not content_key:
+            return None
+        entry = self.db.get_cached_media(content_key, self.config.MEDIA_CACHE_TTL_HOURS)
+        if not entry or entry["type"] != kind or not entry["items"]:
+            return None
+        self.content_hits += 1
+        logger.info(f"Isi file sudah pernah dikirim ({content_key[:20]}…) — pakai file_id, tanpa upload")
+        return entry["items"][0]["file_id"]
+
+    async def _send_media(self, platform, downloader, bot: Bot, chat_id: int, url: str,
+                          user_id: int, tier: str, on_position=None, progress=None) -> dict:
+        """Download + kirim satu link. Kembalikan ringkasan untuk pesan progres.
+
+        Download baru masuk antrian scheduler sesuai tier; yang menumpang flight
+        (link sama sedang diunduh) tidak ikut antri lagi. ``progress`` menerima
+        tahap resolving/downloading (dari hook yt-dlp) dan uploading. Link yang
+        sudah pasti gagal (dihapus/private) dijawab dari cache ``dead_links``.
+        """
+        link_key = f"{platform}:{self._link_key(url)}"
+        dead     = self.dead_links.get(link_key)
+        if dead:
+            return {"success": False, "error": dead}
+
+        media_key, url = await self._media_key(platform, url)
+        dead = self.dead_links.get(media_key) if media_key else None
+        if dead:
+            return {"success": False, "error": dead}
+        cached = await self._send_cached(bot, chat_id, media_key, user_id)
+        if cached:
+            return self._outcome(cached["type"], len(cached["items"]))
+
+        async with self.coalescer.join(
+            media_key,
+            lambda: self.scheduler.run(tier, user_id, lambda: downloader.download(url, progress), on_position),
+            self._release_result,
+        ) as flight:
+            result = flight.result
+            if not result["success"]:
+                if result.get("permanent"):
+                    # ID kanonik kalau ada, kalau tidak (link pendek notfound) link aslinya
+                    self.dead_links.set(media_key or link_key, result["error"])
+                return {"success": False, "error": result["error"]}
+
+            async with flight.lock:
+                # Pengirim sebelumnya di flight yang sama mungkin sudah upload → pakai file_id
+                if flight.shared:
+                    cached = await self._send_cached(bot, chat_id, media_key, user_id)
+                    if cached:
+                        return self._outcome(cached["type"], len(cached["items"]))
+                if progress:
+                    progress("uploading", None)
+                await self._deliver(bot, chat_id, user_id, media_key, result)
+                return self._outcome(result["type"], result.get("count", 1))
 
-        chat_id = update.effective_chat.id
+    @staticmethod
+    def _outcome(media_type: str, count: int) -> dict:
+        return {"success": True, "type": media_type, "count": count}
 
+    async def _deliver(self, bot: Bot, chat_id: int, user_id: int, media_key: str | None, result: dict):
+        """Kirim hasil download (album atau satu file) lalu simpan file_id-nya ke cache."""
         if result["type"] == "carousel":
-            await proc_msg.edit_text(
-                MESSAGES["carousel_success"].format(count=result["count"]),
-                parse_mode="HTML",
-            )
             base_caption = self._clean_caption(result.get("caption", ""))[:1024]
-            for i, path in enumerate(result["files"]):
+            for _ in result["files"]:
                 self.db.record_download(user_id)
-                caption = f"<b>Part {i + 1}/{result['count']}</b>"
-                if base_caption and i == 0:
-                    caption += f"\n\n{base_caption}"
-                try:
-                    if path.endswith((".mp4", ".mov", ".avi")):
-                        with open(path, "rb") as f:
-                            await context.bot.send_video(chat_id=chat_id, video=f,
-                                                         caption=caption, parse_mode="HTML")
-                    else:
-                        await context.bot.send_photo(chat_id=chat_id, photo=path,
-                                                     caption=caption, parse_mode="HTML")
-                except Exception as e:
-                    logger.error(f"Error kirim carousel {i + 1}: {e}")
-                _safe_delete(path)
-        else:
-            self.db.record_download(user_id)
-            caption = self._clean_caption(result.get("caption", "")) or MESSAGES["download_success"]
-            if result["type"] == "photo":
-                await context.bot.send_photo(chat_id=chat_id, photo=result["file_path"],
-                                             caption=caption, parse_mode="HTML")
-            else:
-                with open(result["file_path"], "rb") as f:
-                    await context.bot.send_video(chat_id=chat_id, video=f,
-                                                 caption=caption, parse_mode="HTML")
-            _safe_delete(result["file_path"])
-            await proc_msg.delete()
+            items = []
+            for path in result["files"]:
+                kind = self._media_kind(path)
+                items.append((kind, self._known_file_id(kind, path) or path))
+            sent = await self._send_album(bot, chat_id, items, base_caption or None)
+            for (_, media), path, item in zip(items, result["files"], sent):
+                if item is None and media is not path:
+                    # file_id lama ditolak Telegram, lain kali upload ulang
+                    self.db.delete_cached_media(self._content_key(path))
+            self._cache_sent(media_key, "carousel", sent, result["files"])
+            return
+
+        self.db.record_download(user_id)
+        caption = self._clean_caption(result.get("caption", "")) or MESSAGES["download_success"]
+        kind    = "photo" if result["type"] == "photo" else "video"
+        path    = result["file_path"]
+        file_id = self._known_file_id(kind, path)
+        msg     = None
+        if file_id:
+            try:
+                msg = await self._upload(bot, chat_id, kind, file_id, caption)
+            except BadRequest as e:
+                logger.warning(f"file_id dari cache isi file tidak valid, upload ulang: {e}")
+                self.db.delete_cached_media(self._content_key(path))
+        if msg is None:
+            msg = await self._upload(bot, chat_id, kind, path, caption)
+        self._cache_sent(media_key, result["type"], [self._sent_item(kind, msg, caption)], [path])
+
+    def _release_result(self, result: dict) -> None:
+        """Hapus file hasil download; dipanggil coalescer setelah pengirim terakhir selesai."""
+        if not result or not result.get("success"):
+            return
+        for path in result.get("files") or [result.get("file_path")]:
+            self.store.release(path)
 
     # ── Menu callbacks ──────────────────────────────────────────────────────────
 
@@ -460,11 +852,70 @@ class DownloaderBot:
 
         stats = self.db.get_user_stats()
         pay   = stats["payment_stats"]
+        pool  = self.executor.stats()
+        rc    = self.resolve_cache.stats()
+        dl    = self.dead_links.stats()
+        ms    = self.store.stats()
+        pd    = self.partials.stats()
+        up    = self.update_processor.stats() if self.update_processor else None
+        sq    = self.scheduler.stats()
+        ac    = self.admission.stats()
+        rss   = f"{ac['rss'] / 1048576:.0f} MB" if ac["rss"] else "-"
+        cb_lines = "".join(
+            f"• {name}: {_BREAKER_LABELS.get(b['state'], b['state'])}"
+            + (f" ({b['retry_after'] / 60:.0f} mnt lagi)" if b["retry_after"] else "")
+            + f" | {b['opened']}x terbuka, {b['rejected']} ditolak cepat\n"
+            for name, b in self.breakers.stats().items()
+        )
+        rg_lines = "".join(
+            f"• {name}: {g['per_minute']:.0f}/{g['max_per_minute']:.0f} per menit | "
+            f"tunggu {g['avg_wait']:.1f}s, {g['refused']} ditolak, {g['throttles']}x kena 429\n"
+            for name, g in self.governor.stats().items()
+        )
+        hedge_line = ""
+        if self.instagram.hedge:
+            hs = self.instagram.hedge.stats()
+            hedge_line = (
+                f"• Balapan IG (jeda {hs['delay']:g}s): {hs['hedged']}/{hs['runs']} dipicu | "
+                + ", ".join(
+                    f"{name} menang {st['win_rate'] * 100:.0f}%"
+                    + (f" p50 {st['p50']:.1f}s/p90 {st['p90']:.1f}s" if st["p50"] is not None else "")
+                    for name, st in hs["strategies"].items()
+                )
+                + "\n"
+            )
+        up_line = f"• Update paralel: {up['active']}/{up['limit']} ({up['users']} user aktif)\n" if up else ""
         text  = (
             "📊 <b>Statistik Bot</b>\n\n"
             f"👥 Total user: <b>{stats['total_users']}</b>\n"
             f"👑 VIP aktif: <b>{stats['vip_users']}</b>\n"
-            f"📥 Download hari ini: <b>{stats['downloads_today']}</b>\n\n"
+            f"📥 Download hari ini: <b>{stats['downloads_today']}</b>\n"
+            f"🗂 Cache file_id: <b>{stats['cache_entries']}</b> media, <b>{stats['cache_hits']}</b> hit\n\n"
+            "<b>⚙️ Download Worker:</b>\n"
+            f"• Aktif: {pool['running']}/{pool['workers']} | Antri: {pool['queued']}\n"
+            f"• Tunggu rata-rata: {pool['avg_wait']:.1f}s | maks: {pool['max_wait']:.1f}s\n"
+            f"• Antrian: admin {sq['queued']['admin']} / VIP {sq['queued']['vip']} / gratis {sq['queued']['free']}"
+            f" | jalan {sq['active']}/{sq['limit']}\n"
+            f"• Tunggu antrian: VIP {sq['avg_wait']['vip']:.1f}s / gratis {sq['avg_wait']['free']:.1f}s\n"
+            f"• Ditolak saat sibuk: {ac['shed_total']} | RAM: {rss}"
+            f"{' | ⚠️ ' + ac['overload'] if ac['overload'] else ''}\n"
+            f"• Digabung (link sama): {self.coalescer.coalesced}\n"
+            f"{hedge_line}"
+            f"{up_line}"
+            f"• Cache link pendek: {rc['hits']} hit / {rc['misses']} miss ({rc['size']} entri)\n"
+            f"• Link mati dijawab dari cache: {dl['hits']} ({dl['size']} entri)\n"
+            f"• Disk sementara: {ms['usage'] / 1048576:.0f}/{ms['max_bytes'] / 1048576:.0f} MB, "
+            f"{ms['files']} file ({ms['pinned']} dipakai), {ms['evicted']} dibuang, "
+            f"{ms['in_memory']} media kecil lewat RAM\n"
+            f"• Download dilanjutkan: {pd['resumed']}x ({pd['resumed_bytes'] / 1048576:.0f} MB hemat) | "
+            f".part {ms['partials']} file {ms['partial_bytes'] / 1048576:.0f} MB, "
+            f"{pd['discarded']} basi, {pd['corrupt']} rusak\n"
+            f"• Isi file kembar: {ms['deduped']} di-hardlink ({ms['deduped_bytes'] / 1048576:.0f} MB), "
+            f"{self.content_hits} upload dilewati\n\n"
+            "<b>🚧 Circuit Breaker:</b>\n"
+            f"{cb_lines}\n"
+            "<b>🚦 Laju ke Upstream:</b>\n"
+            f"{rg_lines}\n"
             "<b>💳 Pembayaran:</b>\n"
             + ("\n".join(f"• {k}: {v}" for k, v in pay.items()) if pay else "• Belum ada data")
         )
@@ -494,7 +945,7 @@ class DownloaderBot:
             donation_id = donation["id"]
             amount_raw  = donation["amount_raw"]
 
-            qr_path = await self.saweria.generate_qr_image(donation["qr_string"], donation_id)
+            qr_png  = await self.saweria.generate_qr_bytes(donation["qr_string"])
 
             payment_id = self.db.record_payment(
                 user_id=user_id, days=days, amount=price,
@@ -502,12 +953,11 @@ class DownloaderBot:
             )
 
             caption = MESSAGES["qr_caption"].format(days=days, amount=amount_pay)
-            with open(qr_path, "rb") as f:
-                await context.bot.send_photo(
-                    chat_id=query.message.chat_id,
-                    photo=f, caption=caption, parse_mode="HTML",
-                )
-            SaweriaAPI.delete_qr_file(donation_id)
+            await context.bot.send_photo(
+                chat_id=query.message.chat_id,
+                photo=qr_png, filename=f"qr_{donation_id}.png",
+                caption=caption, parse_mode="HTML",
+            )
 
             task = asyncio.create_task(self._poll_payment(
                 bot=context.bot, user_id=user_id, donation_id=donation_id,
@@ -804,20 +1254,58 @@ class DownloaderBot:
     async def _job_cleanup_vip(self, context: ContextTypes.DEFAULT_TYPE):
         self.db.cleanup_expired_vip()
 
+    async def _job_prune_media_cache(self, context: ContextTypes.DEFAULT_TYPE):
+        self.db.prune_media_cache(
+            self.config.MEDIA_CACHE_TTL_HOURS,
+            self.config.MEDIA_CACHE_MAX_ENTRIES,
+        )
+        self.db.purge_kv_cache()
+
+    async def _job_sweep_media(self, context: ContextTypes.DEFAULT_TYPE):
+        # File yang bocor (gagal kirim, .part yt-dlp) dihapus, disk dijaga di bawah batas
+        self.store.sweep()
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────────
+
+    async def _post_init(self, app: Application):
+        # Bangun instance YoutubeDL di awal agar job pertama tidak menanggung biaya init
+        for pool in (self.tiktok.ydl_pool, self.instagram.ydl_pool):
+            await self.executor.run(pool.warm)
+
+    async def _post_shutdown(self, app: Application):
+        self.executor.shutdown()
+        self.tiktok.ydl_pool.close_all()
+        self.instagram.ydl_pool.close_all()
+        await self.http.aclose()
+
+    def _bot_api_pool_size(self) -> int:
+        """Koneksi ke Bot API: tiap update bisa kirim beberapa request sekaligus (album, progres)."""
+        if self.config.TELEGRAM_POOL_SIZE:
+            return self.config.TELEGRAM_POOL_SIZE
+        per_update = self.config.MESSAGE_LINK_CONCURRENCY + 1
+        return max(1, self.config.CONCURRENT_UPDATES) * per_update + 16
+
     # ── Run ──────────────────────────────────────────────────────────────────────
 
     def run(self):
         logger.info("🤖 Memulai Bot Downloader...")
 
-        app = (
+        builder = (
             Application.builder()
             .token(self.config.BOT_TOKEN)
             .connect_timeout(30)
             .read_timeout(30)
             .write_timeout(30)
             .pool_timeout(30)
-            .build()
+            .connection_pool_size(self._bot_api_pool_size())
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
         )
+        if self.config.CONCURRENT_UPDATES > 1:
+            # Update antar user paralel, update dari user yang sama tetap berurutan
+            self.update_processor = PerUserUpdateProcessor(self.config.CONCURRENT_UPDATES)
+            builder = builder.concurrent_updates(self.update_processor)
+        app = builder.build()
 
         if self.config.GROQ_API_KEY:
             self.monitor = GroqMonitor(
@@ -860,21 +1348,15 @@ class DownloaderBot:
 
         if app.job_queue:
             app.job_queue.run_repeating(self._job_cleanup_vip, interval=3600)
+            app.job_queue.run_repeating(self._job_prune_media_cache, interval=3600, first=60)
+            app.job_queue.run_repeating(
+                self._job_sweep_media, interval=self.config.MEDIA_STORE_SWEEP_SECONDS, first=10,
+            )
 
         logger.info("🚀 Bot siap melayani!")
         app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
-# ── Helpers ──────────────────────────────────────────────────────────────────────
-
-def _safe_delete(path: str) -> None:
-    try:
-        if path and os.path.exists(path):
-            os.remove(path)
-    except Exception:
-        pass
-
-
 # ── Entry point ──────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -0,0 +1,371 @@
+"""Disk-budgeted scratch space for downloaded media, small items stay in memory"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+# yt-dlp writes these while a download is running: x.mp4.part, fragment
+# downloads x.mp4.part-Frag3 (+ .part) next to an x.mp4.ytdl state file
+IN_PROGRESS_SUFFIXES = ('.ytdl', '.temp')
+
+
+def is_in_progress(path: str) -> bool:
+    return '.part' in os.path.basename(path) or path.endswith(IN_PROGRESS_SUFFIXES)
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MemoryMedia:
+    """Downloaded media small enough to go from fetch to upload without a temp file.
+
+    Results carry it in place of a path; ``filename`` keeps the extension
+    so the bot can still tell photos from videos.
+    """
+
+    __slots__ = ("data", "filename", "_digest")
+
+    def __init__(self, data: bytes, filename: str):
+        self.data = data
+        self.filename = filename
+        self._digest: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+
+class _Entry:
+    __slots__ = ("size", "last_used", "pins", "digest")
+
+    def __init__(self, size: int, pins: int = 0, digest: Optional[str] = None):
+        self.size = size
+        self.last_used = time.time()
+        self.pins = pins
+        self.digest = digest
+
+
+class MediaStore:
+    """Tracks every media file the downloaders write and keeps them on budget.
+
+    Downloaders ``track`` each file they hand out; every ``track`` adds a
+    pin, every ``release`` drops one and the file is deleted when the last
+    holder releases it. When tracked usage goes over ``high_watermark`` of
+    ``max_bytes``, unpinned files are evicted least recently used first
+    until usage drops to ``low_watermark``.
+    ``sweep`` (run on the job queue) also adopts files nobody tracked
+    (files from before a restart) once they have sat untouched for
+    ``adopt_grace`` seconds, so a download that just finished and is
+    still being hashed by ``track`` cannot be adopted and evicted. It
+    drops unpinned files older than ``max_age`` and pinned ones older
+    than ``pin_timeout``, which only a crashed send can leave behind. yt-dlp partial files are left alone so
+    a retry can resume them, until they go ``partial_max_age`` unwritten.
+
+    With ``dedup`` every tracked file is hashed; a file whose content is
+    already on disk (the same video reposted under another ID) is replaced
+    by a hard link to it, and the shared blob counts once against the
+    budget until its last link is gone. ``digest`` exposes the hash so the
+    bot can reuse a Telegram file_id it already has for that content.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 2 * 1024 ** 3,
+        high_watermark: float = 0.9,
+        low_watermark: float = 0.7,
+        max_age: float = 3600,
+        pin_timeout: float = 6 * 3600,
+        memory_threshold: int = 2 * 1024 * 1024,
+        partial_max_age: Optional[float] = None,
+        dedup: bool = True,
+        adopt_grace: float = 60,
+    ):
+        self.max_bytes = max(1, max_bytes)
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.max_age = max_age
+        self.pin_timeout = pin_timeout
+        self.partial_max_age = max_age if partial_max_age is None else partial_max_age
+        self.memory_threshold = memory_threshold
+        self.dedup = dedup
+        self.adopt_grace = adopt_grace
+        self._dirs: Set[str] = set()
+        self._files: Dict[str, _Entry] = {}
+        # content hash -> every tracked path linked to that blob
+        self._blobs: Dict[str, Set[str]] = {}
+        self._usage = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.expired = 0
+        self.in_memory = 0
+        self.partials = 0
+        self.partial_bytes = 0
+        self.deduped = 0
+        self.deduped_bytes = 0
+
+    @property
+    def high_bytes(self) -> int:
+        return int(self.max_bytes * self.high_watermark)
+
+    @property
+    def low_bytes(self) -> int:
+        return int(self.max_bytes * self.low_watermark)
+
+    @property
+    def usage(self) -> int:
+        return self._usage
+
+    def register_dir(self, path: str) -> str:
+        """Create ``path`` if needed and include it in sweeps"""
+        os.makedirs(path, exist_ok=True)
+        self._dirs.add(os.path.abspath(path))
+        return path
+
+    def track(self, path: str, pin: bool = True, digest: Optional[str] = None) -> str:
+        """Record a freshly written file (pinned by default) and enforce the budget.
+
+        Pass ``digest`` when the content was already hashed on the way in;
+        otherwise the file is read back here to hash it. Blocking: never call
+        it from the event loop (downloaders track from the download pool).
+        """
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return path
+        if self.dedup and digest is None and size and path not in self._files:
+            try:
+                digest = file_digest(path)
+            except OSError as e:
+                logger.warning(f"Media store: cannot hash {path}: {e}")
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is None:
+                entry = self._files[path] = _Entry(size, pins=1 if pin else 0)
+                if self.dedup and digest:
+                    entry.digest = self._link_locked(path, digest, size)
+                self._charge_locked(path, entry)
+            else:
+                self._usage += size - entry.size
+                entry.size = size
+                entry.last_used = time.time()
+                if pin:
+                    entry.pins += 1
+            if self._usage > self.high_bytes:
+                self._evict_locked()
+        return path
+
+    async def keep(self, data: bytes, path: str) -> Union[MemoryMedia, str]:
+        """Hold ``data`` in memory when small enough, otherwise write and track ``path``
+
+        Large items are hashed and written in a worker thread, off the event loop.
+        """
+        if len(data) <= self.memory_threshold:
+            self.in_memory += 1
+            return MemoryMedia(data, os.path.basename(path))
+        return await asyncio.to_thread(self._write, data, path)
+
+    def _write(self, data: bytes, path: str) -> str:
+        with open(path, 'wb') as f:
+            f.write(data)
+        return self.track(path, digest=hashlib.sha256(data).hexdigest() if self.dedup else None)
+
+    def digest(self, media: Union[MemoryMedia, str, None]) -> Optional[str]:
+        """Content hash of a tracked file or in-memory item (None if unknown)"""
+        if isinstance(media, MemoryMedia):
+            return media.digest if self.dedup else None
+        if not isinstance(media, str) or not media:
+            return None
+        with self._lock:
+            entry = self._files.get(os.path.abspath(media))
+            return entry.digest if entry is not None else None
+
+    def release(self, path: Union[MemoryMedia, str, None]) -> None:
+        """The caller is done with ``path``: drop its pin, delete it once nobody holds it"""
+        if not isinstance(path, str) or not path:
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and entry.pins > 1:
+                # another delivery tracked the same file and is still sending it
+                entry.pins -= 1
+                entry.last_used = time.time()
+                return
+            self._forget_locked(path)
+        self._unlink(path)
+
+    def sweep(self) -> Dict:
+        """Reconcile with the directories, expire old files and enforce the budget"""
+        now = time.time()
+        on_disk: Dict[str, os.stat_result] = {}
+        for directory in list(self._dirs):
+            try:
+                with os.scandir(directory) as it:
+                    for item in it:
+                        if item.is_file(follow_symlinks=False):
+                            on_disk[item.path] = item.stat(follow_symlinks=False)
+            except OSError as e:
+                logger.warning(f"Media store: cannot scan {directory}: {e}")
+
+        expired: List[str] = []
+        partials = partial_bytes = 0
+        with self._lock:
+            for path in [p for p in self._files if p not in on_disk]:
+                self._forget_locked(path)
+
+            for path, st in on_disk.items():
+                entry = self._files.get(path)
+                if entry is None:
+                    if is_in_progress(path):
+                        # kept for resuming, outside the budget, until nothing writes it for a while
+                        if now - st.st_mtime > self.partial_max_age:
+                            expired.append(path)
+                        else:
+                            partials += 1
+                            partial_bytes += st.st_size
+                        continue
+                    # ctime, not mtime: yt-dlp backdates mtime to the server's Last-Modified
+                    if now - st.st_ctime < self.adopt_grace:
+                        continue
+                    # leaked or left by a previous process, age it by mtime
+                    entry = self._files[path] = _Entry(st.st_size)
+                    entry.last_used = st.st_mtime
+                    self._usage += st.st_size
+                elif entry.size != st.st_size:
+                    self._usage += st.st_size - entry.size
+                    entry.size = st.st_size
+
+                limit = self.pin_timeout if entry.pins else self.max_age
+                if now - entry.last_used > limit:
+                    expired.append(path)
+
+            for path in expired:
+                self._forget_locked(path)
+            self.expired += len(expired)
+            self.partials, self.partial_bytes = partials, partial_bytes
+            if self._usage > self.high_bytes:
+                self._evict_locked()
+
+        for path in expired:
+            self._unlink(path)
+        if expired:
+            logger.info(f"Media store: expired {len(expired)} old files")
+        return self.stats()
+
+    def _evict_locked(self) -> None:
+        victims = sorted(
+            (entry.last_used, path)
+            for path, entry in self._files.items() if not entry.pins
+        )
+        freed = 0
+        for _, path in victims:
+            if self._usage <= self.low_bytes:
+                break
+            before = self._usage
+            self._forget_locked(path)
+            self._unlink(path)
+            freed += before - self._usage
+            self.evicted += 1
+        self.evicted_bytes += freed
+        if freed:
+            logger.info(
+                f"Media store: evicted {freed / 1048576:.1f} MB, "
+                f"usage now {self._usage / 1048576:.1f} MB"
+            )
+        if self._usage > self.high_bytes:
+            logger.warning(
+                f"Media store over budget with pinned files: "
+                f"{self._usage / 1048576:.1f} MB in use"
+            )
+
+    def _link_locked(self, path: str, digest: str, size: int) -> Optional[str]:
+        """Swap ``path`` for a hard link to a tracked copy of the same content.
+
+        Returns the digest the entry should be filed under, or None when the
+        file has to stay a separate copy (no hard links on this filesystem).
+        """
+        for source in self._blobs.get(digest, ()):
+            if self._files[source].size != size:
+                continue
+            tmp = f"{path}.{os.getpid()}.link"
+            try:
+                if not os.path.samefile(source, path):
+                    os.link(source, tmp)
+                    os.replace(tmp, path)
+                    self.deduped += 1
+                    self.deduped_bytes += size
+                    logger.info(f"Media store: {os.path.basename(path)} duplicates {os.path.basename(source)}, linked")
+                return digest
+            except OSError as e:
+                logger.debug(f"Media store: cannot link {path} to {source}: {e}")
+                self._unlink(tmp)
+                return None
+        return digest
+
+    def _charge_locked(self, path: str, entry: _Entry) -> None:
+        if entry.digest:
+            paths = self._blobs.setdefault(entry.digest, set())
+            shared = bool(paths)
+            paths.add(path)
+            if shared:
+                return
+        self._usage += entry.size
+
+    def _forget_locked(self, path: str) -> None:
+        entry = self._files.pop(path, None)
+        if entry is None:
+            return
+        if entry.digest:
+            paths = self._blobs.get(entry.digest, set())
+            paths.discard(path)
+            if paths:
+                # another link still holds the data
+                return
+            self._blobs.pop(entry.digest, None)
+        self._usage -= entry.size
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to remove {path}: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pinned = sum(1 for entry in self._files.values() if entry.pins)
+            files = len(self._files)
+        return {
+            "files": files,
+            "pinned": pinned,
+            "usage": self._usage,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+            "evicted_bytes": self.evicted_bytes,
+            "expired": self.expired,
+            "in_memory": self.in_memory,
+            "partials": self.partials,
+            "partial_bytes": self.partial_bytes,
+            "deduped": self.deduped,
+            "deduped_bytes": self.deduped_bytes,
+        }
@@ -1,7 +1,7 @@
 import asyncio
+import io
 import json
 import logging
-import os
 import qrcode
 
 logger = logging.getLogger(__name__)
@@ -155,21 +155,11 @@ class SaweriaAPI:
             logger.warning(f"check_payment_status error: {e}")
         return None
 
-    async def generate_qr_image(self, qr_string: str, donation_id: str) -> str:
-        """Generate QR code PNG dari qr_string, simpan ke /tmp. Kembalikan path file."""
+    async def generate_qr_bytes(self, qr_string: str) -> bytes:
+        """Generate QR code PNG dari qr_string langsung di memori (tanpa file /tmp)."""
         def _make():
-            img = qrcode.make(qr_string)
-            path = f"/tmp/qr_{donation_id}.png"
-            img.save(path)
-            return path
+            buf = io.BytesIO()
+            qrcode.make(qr_string).save(buf)
+            return buf.getvalue()
 
         return await asyncio.get_event_loop().run_in_executor(None, _make)
-
-    @staticmethod
-    def delete_qr_file(donation_id: str) -> None:
-        path = f"/tmp/qr_{donation_id}.png"
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
@@ -0,0 +1,223 @@
+"""Live-edited progress messages for a single link or a batch of links"""
+import asyncio
+import html
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from telegram.error import BadRequest, RetryAfter
+
+from bot.constants import MESSAGES
+
+logger = logging.getLogger(__name__)
+
+PLATFORM_LABELS = {"tiktok": "TikTok", "instagram": "Instagram"}
+
+
+class EditThrottle:
+    """Progress-edit budget shared by every active job.
+
+    A global token bucket (``rate`` edits per second) keeps the total under
+    Telegram's flood limit, and ``min_interval`` spaces edits of any one
+    message. After a RetryAfter, all progress edits wait until it expires.
+    """
+
+    def __init__(self, rate: float = 20.0, min_interval: float = 3.0):
+        self.rate         = max(0.1, rate)
+        self.min_interval = min_interval
+        self._tokens      = self.rate
+        self._updated     = time.monotonic()
+        self._blocked     = 0.0
+        self._lock        = asyncio.Lock()
+        self.edits        = 0
+        self.flooded      = 0
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked:
+                    await asyncio.sleep(self._blocked - now)
+                    continue
+                self._tokens  = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.edits   += 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def back_off(self, seconds: float) -> None:
+        self.flooded += 1
+        self._blocked = max(self._blocked, time.monotonic() + seconds)
+
+
+class ThrottledMessage(ABC):
+    """Telegram message re-rendered whenever its state changes.
+
+    ``changed`` is safe to call from any thread (yt-dlp hooks run in the
+    download pool): the edit is scheduled on the event loop, bursts of
+    changes collapse into one edit, and edits are at least
+    ``min_interval`` apart. ``flush(force=True)`` edits right away (for
+    final states); ``close`` cancels any pending edit.
+    """
+
+    def __init__(self, throttle: EditThrottle, message=None):
+        self.message  = message
+        self.throttle = throttle
+        self.closed   = False
+        self._loop    = asyncio.get_running_loop()
+        self._lock    = asyncio.Lock()
+        self._last    = None
+        self._last_at = 0.0
+        self._pending: Optional[asyncio.Handle] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    def render(self) -> str:
+        """Current message text (HTML)"""
+
+    def changed(self) -> None:
+        self._loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self) -> None:
+        if self.closed or self._pending or self.message is None:
+            return
+        delay = max(0.0, self._last_at + self.throttle.min_interval - self._loop.time())
+        self._pending = self._loop.call_later(delay, self._fire)
+
+    def _fire(self) -> None:
+        self._pending = None
+        if not self.closed:
+            self._task = asyncio.ensure_future(self.flush())
+
+    async def flush(self, force: bool = False) -> None:
+        async with self._lock:
+            if self.message is None or (self.closed and not force):
+                return
+            text = self.render()
+            if text == self._last:
+                return
+            if not force:
+                await self.throttle.acquire()
+                if self.closed:
+                    return
+            try:
+                await self.message.edit_text(text, parse_mode="HTML")
+                self._last = text
+            except RetryAfter as e:
+                self.throttle.back_off(e.retry_after)
+                logger.warning(f"Progress edit hit the flood limit, holding edits for {e.retry_after}s")
+            except BadRequest as e:
+                # "message is not modified" / the user deleted the message
+                logger.debug(f"Progress edit skipped: {e}")
+            except Exception as e:
+                logger.warning(f"Failed to edit progress message: {e}")
+            self._last_at = self._loop.time()
+
+    async def close(self) -> None:
+        """Stop progress edits and wait for an edit already in flight"""
+        self.closed = True
+        if self._pending:
+            self._pending.cancel()
+            self._pending = None
+        async with self._lock:
+            pass
+
+
+def stage_text(stage: Optional[str], percent: Optional[float] = None) -> str:
+    """Label for a progress stage, with a bar for the download percentage"""
+    stages = MESSAGES["progress_stages"]
+    label  = stages.get(stage, stages["resolving"])
+    if stage == "downloading" and percent is not None:
+        filled = int(min(100.0, max(0.0, percent)) // 10)
+        return f"{label} {'▓' * filled}{'░' * (10 - filled)} {percent:.0f}%"
+    return label
+
+
+class LiveProgress(ThrottledMessage):
+    """Progress of one link: queued -> resolving -> downloading % -> uploading"""
+
+    def __init__(self, throttle: EditThrottle, message=None):
+        super().__init__(throttle, message)
+        self.position = 0
+        self.stage: Optional[str] = None
+        self.percent: Optional[float] = None
+
+    def render(self) -> str:
+        if self.position:
+            return MESSAGES["queued"].format(position=self.position)
+        if self.stage is None:
+            return MESSAGES["processing"]
+        return MESSAGES["progress"].format(stage=stage_text(self.stage, self.percent))
+
+    def report(self, stage: str, percent: Optional[float] = None) -> None:
+        """Downloader progress callback (may be called from a worker thread)"""
+        self.stage, self.percent = stage, percent
+        self.changed()
+
+    async def queued(self, position: int) -> None:
+        """Scheduler queue position (0 = the download has started)"""
+        self.position = position
+        if position:
+            self.changed()
+        else:
+            # our turn: replace the queue message right away
+            await self.flush(force=True)
+
+
+class BatchProgress(ThrottledMessage):
+    """Status of every link of one message, rendered into one Telegram message.
+
+    Finished links (``done``/``failed``) are edited in at once; queue
+    positions and download progress ride along with the next throttled edit.
+    """
+
+    PENDING, OK, FAILED = "⏳", "✅", "❌"
+
+    def __init__(self, platforms: list, throttle: EditThrottle, skipped: int = 0, message=None):
+        super().__init__(throttle, message)
+        self.labels  = [PLATFORM_LABELS.get(p, p) for p in platforms]
+        self.status  = [self.PENDING] * len(platforms)
+        self.notes   = [""] * len(platforms)
+        self.skipped = skipped
+
+    @property
+    def finished(self) -> bool:
+        return self.PENDING not in self.status
+
+    def render(self) -> str:
+        lines = "\n".join(
+            f"{i + 1}. {status} {label}{note}"
+            for i, (status, label, note) in enumerate(zip(self.status, self.labels, self.notes))
+        )
+        skipped = MESSAGES["batch_skipped"].format(count=self.skipped) if self.skipped else ""
+        if self.finished:
+            ok = self.status.count(self.OK)
+            return MESSAGES["batch_done"].format(ok=ok, total=len(self.status), lines=lines, skipped=skipped)
+        return MESSAGES["batch_progress"].format(total=len(self.status), lines=lines, skipped=skipped)
+
+    async def queued(self, index: int, position: int) -> None:
+        """Scheduler queue position (0 = the download has started)"""
+        if self.status[index] != self.PENDING:
+            return
+        self.notes[index] = f" — antrian #{position}" if position else ""
+        self.changed()
+
+    def report(self, index: int, stage: str, percent: Optional[float] = None) -> None:
+        """Downloader progress callback for link number ``index``"""
+        if self.status[index] != self.PENDING:
+            return
+        self.notes[index] = f" — {stage_text(stage, percent)}"
+        self.changed()
+
+    async def done(self, index: int, count: int = 1) -> None:
+        self.status[index] = self.OK
+        self.notes[index]  = f" ({count} file)" if count > 1 else ""
+        await self.flush(force=True)
+
+    async def failed(self, index: int, error: str) -> None:
+        self.status[index] = self.FAILED
+        self.notes[index]  = f" — {html.escape(str(error))[:120]}"
+        await self.flush(force=True)
@@ -0,0 +1,160 @@
+"""Upstream rate governor: token buckets per platform and endpoint class"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .utils import DownloadException
+
+logger = logging.getLogger(__name__)
+
+# endpoint classes: short-link resolves, metadata (pages, oEmbed, extract_info), media CDN
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    "tiktok:resolve": (120, 20),
+    "tiktok:metadata": (60, 10),
+    "tiktok:media": (240, 40),
+    "instagram:metadata": (20, 5),
+    "instagram:media": (120, 20),
+}
+
+PLATFORM_LABELS = {"tiktok": "TikTok", "instagram": "Instagram"}
+
+
+class RateLimitedException(DownloadException):
+    """No upstream token became free within the allowed wait"""
+    pass
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """``"tiktok:metadata=60/10,instagram:media=120"`` -> {name: (per_minute, burst)}"""
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        rate, _, burst = value.partition("/")
+        per_minute = float(rate)
+        limits[name.strip()] = (per_minute, float(burst) if burst else max(1.0, per_minute / 6))
+    return limits
+
+
+class TokenBucket:
+    """Token bucket whose rate backs off on 429s and creeps back on success.
+
+    Callers reserve a token and sleep until it is due, so waiters are
+    served in arrival order; a reservation further away than ``max_wait``
+    is refused without consuming anything. ``throttled`` halves the rate
+    (down to ``min_fraction`` of the configured rate) and drops any saved
+    burst; every ``ok`` adds back ``recovery`` of the configured rate.
+    Thread-safe, since yt-dlp outcomes are reported from the download pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_minute: float,
+        burst: float,
+        min_fraction: float = 0.1,
+        decrease: float = 0.5,
+        recovery: float = 0.05,
+    ):
+        self.name = name
+        self.max_rate = max(per_minute, 0.1) / 60
+        self.min_rate = self.max_rate * min_fraction
+        self.rate = self.max_rate
+        self.burst = max(1.0, burst)
+        self.decrease = decrease
+        self.recovery = recovery
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.refused = 0
+        self.throttles = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Seconds until the reserved token is due, or None if that is over ``max_wait``"""
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                self.refused += 1
+                return None
+            self._tokens -= 1
+            self.granted += 1
+            self.total_wait += wait
+            return wait
+
+    def throttled(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+            self.throttles += 1
+        logger.warning(f"Rate limit hit on {self.name}, slowing to {self.rate * 60:.1f}/min")
+
+    def ok(self) -> None:
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+    def stats(self) -> Dict:
+        return {
+            "per_minute": self.rate * 60,
+            "max_per_minute": self.max_rate * 60,
+            "granted": self.granted,
+            "refused": self.refused,
+            "throttles": self.throttles,
+            "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+        }
+
+
+class RateGovernor:
+    """Paces every upstream call through the bucket for ``platform:endpoint``.
+
+    Endpoints without a configured limit are not paced. ``acquire`` waits
+    up to ``max_wait`` seconds for a token and raises RateLimitedException
+    (a user-facing message) when the backlog is longer than that.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None, max_wait: float = 20.0):
+        self.max_wait = max_wait
+        self._buckets: Dict[str, TokenBucket] = {
+            name: TokenBucket(name, per_minute, burst)
+            for name, (per_minute, burst) in dict(DEFAULT_LIMITS, **(limits or {})).items()
+            if per_minute > 0
+        }
+
+    async def acquire(self, name: str) -> None:
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return
+        wait = bucket.reserve(self.max_wait)
+        if wait is None:
+            platform = PLATFORM_LABELS.get(name.split(":")[0], name)
+            logger.warning(f"Refusing {name} request: upstream queue longer than {self.max_wait:g}s")
+            raise RateLimitedException(f"{platform} lagi rame kak, coba lagi sebentar maneh.")
+        if wait:
+            await asyncio.sleep(wait)
+
+    def throttled(self, name: str) -> None:
+        """The upstream answered 429 (or an equivalent block) on this endpoint"""
+        bucket = self._buckets.get(name)
+        if bucket is not None:
+            bucket.throttled()
+
+    def ok(self, name: str) -> None:
+        bucket = self._buckets.get(name)
+        if bucket is not None:
+            bucket.ok()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: bucket.stats() for name, bucket in sorted(self._buckets.items())}
@@ -0,0 +1,231 @@
+"""Priority download scheduler: weighted-fair tier lanes with per-user fairness"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TIERS = ("admin", "vip", "free")
+DEFAULT_WEIGHTS = {"admin": 8, "vip": 4, "free": 1}
+
+# position callback: #N while waiting, 0 once the job starts
+PositionCallback = Callable[[int], Awaitable[None]]
+
+
+class _Job:
+    __slots__ = ("tier", "user_id", "granted", "on_position", "enqueued_at", "shown", "notified_at")
+
+    def __init__(self, tier: str, user_id: int, on_position: Optional[PositionCallback]):
+        self.tier = tier
+        self.user_id = user_id
+        self.granted: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.on_position = on_position
+        self.enqueued_at = time.monotonic()
+        self.shown = 0
+        self.notified_at = 0.0
+
+
+class _Lane:
+    """One tier: queued jobs per user, each user's jobs in FIFO order"""
+
+    __slots__ = ("users", "vtime", "served", "total_wait")
+
+    def __init__(self):
+        self.users: Dict[int, Deque[_Job]] = {}
+        self.vtime = 0.0
+        self.served = 0
+        self.total_wait = 0.0
+
+    def __len__(self) -> int:
+        return sum(len(jobs) for jobs in self.users.values())
+
+
+class DownloadScheduler:
+    """Admit downloads in weighted-fair order across tiers.
+
+    Every download waits in its tier's lane until one of ``max_active``
+    slots is free. Lanes are served by virtual time: each job admitted from
+    a lane advances that lane's clock by ``1 / weight``, so at peak admin,
+    VIP and free jobs are admitted in the ratio of their weights while an
+    idle lane never blocks the others. Inside a lane the user with the
+    fewest running jobs goes first (ties take turns), and no user runs more
+    than ``per_user_active`` jobs at once. Waiting jobs
+    are told their place in line through ``on_position``, at most once per
+    ``notify_interval`` seconds. Each dispatch simulates the queue order
+    once and uses it for both admission and the reported positions.
+    """
+
+    def __init__(
+        self,
+        max_active: int = 6,
+        weights: Optional[Dict[str, float]] = None,
+        per_user_active: int = 2,
+        notify_interval: float = 3.0,
+    ):
+        self.max_active = max(1, max_active)
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.per_user_active = max(1, per_user_active)
+        self.notify_interval = notify_interval
+        self._lanes: Dict[str, _Lane] = {tier: _Lane() for tier in TIERS}
+        self._user_active: Dict[int, int] = {}
+        # when each user was last admitted, for round-robin between equals
+        self._last_turn: Dict[int, int] = {}
+        self._turn = 0
+        self._tasks: set = set()
+        self.active = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    async def run(
+        self,
+        tier: str,
+        user_id: int,
+        factory: Callable[[], Awaitable[Any]],
+        on_position: Optional[PositionCallback] = None,
+    ) -> Any:
+        """Wait for a slot in ``tier``'s lane, then await ``factory()``"""
+        job = _Job(tier if tier in self._lanes else "free", user_id, on_position)
+        lane = self._lanes[job.tier]
+        if not lane.users:
+            # a lane coming back from idle must not spend credit saved while empty
+            lane.vtime = max(lane.vtime, self._min_vtime())
+        lane.users.setdefault(user_id, deque()).append(job)
+        self._dispatch()
+
+        try:
+            await job.granted
+        except asyncio.CancelledError:
+            if not self._withdraw(job) and job.granted.done() and not job.granted.cancelled():
+                # admitted just before the cancel landed, hand the slot back
+                self._release(job)
+            raise
+
+        if job.shown:
+            self._notify(job, 0)
+        try:
+            return await factory()
+        finally:
+            self._release(job)
+
+    def _min_vtime(self) -> float:
+        busy = [lane.vtime for lane in self._lanes.values() if lane.users]
+        return min(busy) if busy else max(lane.vtime for lane in self._lanes.values())
+
+    def _order(self, active: Dict[int, int]) -> List[_Job]:
+        """Every queued job in admission order, ignoring the per-user cap.
+
+        Simulated on copies: lanes by virtual time, and inside a lane a heap
+        of users keyed by (running jobs, last turn), so building the whole
+        order costs O(n log users).
+        """
+        active = dict(active)
+        turn = itertools.count(self._turn)
+        lanes: Dict[str, list] = {}
+        for tier, lane in self._lanes.items():
+            if not lane.users:
+                continue
+            heap = [(active.get(uid, 0), self._last_turn.get(uid, -1), uid) for uid in lane.users]
+            heapq.heapify(heap)
+            lanes[tier] = [lane.vtime, heap, {uid: deque(jobs) for uid, jobs in lane.users.items()}]
+
+        order: List[_Job] = []
+        while lanes:
+            tier = min(lanes, key=lambda t: lanes[t][0])
+            state = lanes[tier]
+            # the user with the fewest running jobs goes next, ties by longest since served
+            _, _, uid = heapq.heappop(state[1])
+            jobs = state[2][uid]
+            order.append(jobs.popleft())
+            active[uid] = active.get(uid, 0) + 1
+            if jobs:
+                heapq.heappush(state[1], (active[uid], next(turn), uid))
+            state[0] += 1 / self.weights[tier]
+            if not state[1]:
+                del lanes[tier]
+        return order
+
+    def _dispatch(self) -> None:
+        free = self.max_active - self.active
+        waiting: List[_Job] = []
+        for job in self._order(self._user_active):
+            if free > 0 and self._user_active.get(job.user_id, 0) < self.per_user_active:
+                self._admit(job)
+                free -= 1
+            else:
+                waiting.append(job)
+
+        # everyone still waiting learns their (estimated) place in line
+        for position, job in enumerate(waiting, start=1):
+            if job.shown != position:
+                self._notify(job, position)
+
+    def _admit(self, job: _Job) -> None:
+        lane = self._lanes[job.tier]
+        jobs = lane.users[job.user_id]
+        jobs.remove(job)
+        if not jobs:
+            del lane.users[job.user_id]
+        self._last_turn[job.user_id] = self._turn
+        self._turn += 1
+        lane.vtime += 1 / self.weights[job.tier]
+        lane.served += 1
+        lane.total_wait += time.monotonic() - job.enqueued_at
+        self.active += 1
+        self._user_active[job.user_id] = self._user_active.get(job.user_id, 0) + 1
+        job.granted.set_result(True)
+
+    def _withdraw(self, job: _Job) -> bool:
+        lane = self._lanes[job.tier]
+        jobs = lane.users.get(job.user_id)
+        if not jobs or job not in jobs:
+            return False
+        jobs.remove(job)
+        if not jobs:
+            del lane.users[job.user_id]
+        self._dispatch()
+        return True
+
+    def _release(self, job: _Job) -> None:
+        self.active -= 1
+        self._user_active[job.user_id] -= 1
+        if not self._user_active[job.user_id]:
+            del self._user_active[job.user_id]
+            if not any(job.user_id in lane.users for lane in self._lanes.values()):
+                self._last_turn.pop(job.user_id, None)
+        self._dispatch()
+
+    def _notify(self, job: _Job, position: int) -> None:
+        now = time.monotonic()
+        if job.on_position is None:
+            return
+        if position and job.shown and now - job.notified_at < self.notify_interval:
+            return
+        job.shown = position
+        job.notified_at = now
+        task = asyncio.ensure_future(self._call(job.on_position, position))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _call(callback: PositionCallback, position: int) -> None:
+        try:
+            await callback(position)
+        except Exception as e:
+            logger.debug(f"Queue position update failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "limit": self.max_active,
+            "queued": {tier: len(lane) for tier, lane in self._lanes.items()},
+            "avg_wait": {
+                tier: lane.total_wait / lane.served if lane.served else 0.0
+                for tier, lane in self._lanes.items()
+            },
+        }
@@ -0,0 +1,78 @@
+"""Concurrent update processing that keeps each user's updates in order"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates from different users concurrently, one user at a time.
+
+    Each user has a FIFO lock, so their messages, menu callbacks and quota
+    checks still run in the order Telegram sent them. At most
+    ``max_concurrent`` updates run at once across all users. The global slot
+    is taken only after the user's lock, so a user with a backlog waits in
+    their own line and does not hold slots other users could use.
+    ``max_pending`` bounds how many updates may wait in total. Handlers
+    should hand long work (downloads) to a background task, so slots and
+    user locks only cover the quick, order-sensitive part of an update.
+    """
+
+    def __init__(self, max_concurrent: int, max_pending: int = 1024):
+        super().__init__(max(max_pending, max_concurrent))
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._waiting: Dict[int, int] = {}
+        self.active = 0
+
+    @staticmethod
+    def _user_key(update: object) -> Optional[int]:
+        if isinstance(update, Update):
+            if update.effective_user:
+                return update.effective_user.id
+            if update.effective_chat:
+                return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._user_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._user_locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._user_locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self.active += 1
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+
+    async def initialize(self) -> None:
+        logger.info(f"Concurrent updates enabled: {self.max_concurrent} at once, ordered per user")
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "limit": self.max_concurrent,
+            "users": len(self._user_locks),
+        }
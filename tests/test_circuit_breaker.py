@@ -0,0 +1,137 @@
+import pytest
+
+from bot import circuit_breaker
+from bot.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, is_transport_error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("ig:html", threshold=3, window=60, cooldown=100, max_cooldown=300, probe_timeout=30)
+
+
+def trip(breaker):
+    for _ in range(breaker.threshold):
+        breaker.record_failure("429 Too Many Requests")
+
+
+def test_opens_after_threshold_failures_in_window(breaker):
+    breaker.record_failure("429")
+    breaker.record_failure("429")
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+    breaker.record_failure("429")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.retry_after == 100
+
+
+def test_failures_outside_the_window_do_not_count(breaker, clock):
+    breaker.record_failure("429")
+    breaker.record_failure("429")
+    clock.now += 61
+    breaker.record_failure("429")
+    assert breaker.state == CLOSED
+
+
+def test_one_probe_after_cooldown_and_success_closes(breaker, clock):
+    trip(breaker)
+    clock.now += 100
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_doubled_cooldown(breaker, clock):
+    trip(breaker)
+    clock.now += 100
+    assert breaker.allow()
+
+    breaker.record_failure("still blocked")
+    assert breaker.state == OPEN
+    assert breaker.retry_after == 200
+
+    clock.now += 200
+    assert breaker.allow()
+    breaker.record_failure("still blocked")
+    assert breaker.retry_after == 300  # capped at max_cooldown
+
+
+def test_success_resets_the_cooldown(breaker, clock):
+    trip(breaker)
+    clock.now += 100
+    breaker.allow()
+    breaker.record_failure("still blocked")
+    clock.now += 200
+    breaker.allow()
+    breaker.record_success()
+
+    trip(breaker)
+    assert breaker.retry_after == 100
+
+
+def test_lost_probe_is_replaced_after_probe_timeout(breaker, clock):
+    trip(breaker)
+    clock.now += 100
+    assert breaker.allow()
+
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_release_frees_the_probe(breaker, clock):
+    trip(breaker)
+    clock.now += 100
+    assert breaker.allow()
+
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_release_without_probe_changes_nothing(breaker):
+    breaker.release()
+    assert breaker.state == CLOSED
+
+    trip(breaker)
+    breaker.release()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_registry_shares_one_breaker_per_name(clock):
+    breakers = CircuitBreakers(threshold=1, cooldown=10)
+    breakers.get("tt:web").record_failure("timed out")
+
+    assert breakers.get("tt:web").state == OPEN
+    assert breakers.get("tt:oembed").state == CLOSED
+    assert list(breakers.stats()) == ["tt:oembed", "tt:web"]
+
+
+def test_transport_errors():
+    assert is_transport_error("Read timed out")
+    assert is_transport_error("Connection reset by peer")
+    assert not is_transport_error("Video unavailable")
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from bot.coalescer import RequestCoalescer
+
+
+def test_concurrent_requests_share_one_download():
+    coalescer = RequestCoalescer()
+    calls = 0
+    cleaned = []
+
+    async def download():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"success": True}
+
+    async def request(delay):
+        async with coalescer.join("ig:abc", download, cleaned.append) as flight:
+            shared = flight.shared
+            await asyncio.sleep(delay)
+            assert not cleaned  # still in use
+            return flight.result, shared
+
+    async def main():
+        return await asyncio.gather(*(request(0.01 * i) for i in range(3)))
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert [result for result, _ in results] == [{"success": True}] * 3
+    assert all(shared for _, shared in results)
+    assert cleaned == [{"success": True}]
+    assert coalescer.stats() == {"in_flight": 0, "started": 1, "coalesced": 2}
+
+
+def test_later_request_starts_a_new_download():
+    coalescer = RequestCoalescer()
+    calls = 0
+
+    async def download():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def main():
+        async with coalescer.join("tt:1", download) as flight:
+            first = flight.result
+        async with coalescer.join("tt:1", download) as flight:
+            assert not flight.shared
+            return first, flight.result
+
+    assert asyncio.run(main()) == (1, 2)
+
+
+def test_requests_without_a_key_are_not_coalesced():
+    coalescer = RequestCoalescer()
+
+    async def download():
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def request():
+        async with coalescer.join(None, download) as flight:
+            return flight.result
+
+    async def main():
+        return await asyncio.gather(request(), request())
+
+    first, second = asyncio.run(main())
+    assert first is not second
+    assert coalescer.stats()["coalesced"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_download():
+    coalescer = RequestCoalescer()
+    cleaned = []
+
+    async def download():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def request():
+        async with coalescer.join("k", download, cleaned.append) as flight:
+            return flight.result
+
+    async def main():
+        leaving = asyncio.create_task(request())
+        staying = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(main()) == "done"
+    assert cleaned == ["done"]
+
+
+def test_download_is_cancelled_when_every_waiter_leaves():
+    coalescer = RequestCoalescer()
+    cancelled = False
+
+    async def download():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def request():
+        async with coalescer.join("k", download):
+            pass
+
+    async def main():
+        waiter = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled
+    assert coalescer.in_flight == 0
+
+
+def test_failed_download_is_not_cleaned_up():
+    coalescer = RequestCoalescer()
+    cleaned = []
+
+    async def download():
+        raise RuntimeError("boom")
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with coalescer.join("k", download, cleaned.append):
+                pass
+
+    asyncio.run(main())
+    assert cleaned == []
+    assert coalescer.in_flight == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from bot.downloaders.formats import FileTooLargeException, SizeAwareFormatSelector, estimate_size
+
+MB = 1024 * 1024
+
+
+def select(formats, max_bytes=50 * MB):
+    return next(SizeAwareFormatSelector(max_bytes)({"formats": formats}))["format_id"]
+
+
+def test_estimate_size_prefers_exact_filesize():
+    assert estimate_size({"filesize": 10, "filesize_approx": 20}) == 10
+    assert estimate_size({"filesize_approx": 20}) == 20
+    assert estimate_size({}) is None
+
+
+def test_picks_the_best_complete_format_that_fits():
+    formats = [
+        {"format_id": "360p", "vcodec": "h264", "acodec": "aac", "filesize": 10 * MB},
+        {"format_id": "720p", "vcodec": "h264", "acodec": "aac", "filesize_approx": 40 * MB},
+        {"format_id": "1080p", "vcodec": "h264", "acodec": "aac", "filesize": 90 * MB},
+    ]
+    assert select(formats) == "720p"
+
+
+def test_unknown_size_is_accepted():
+    formats = [
+        {"format_id": "small", "vcodec": "h264", "acodec": "aac", "filesize": 10 * MB},
+        {"format_id": "unknown", "vcodec": "h264", "acodec": "aac"},
+    ]
+    assert select(formats) == "unknown"
+
+
+def test_video_only_is_a_fallback_and_audio_or_storyboards_never_are():
+    formats = [
+        {"format_id": "sb0", "vcodec": "none", "acodec": "none", "ext": "mhtml"},
+        {"format_id": "audio", "vcodec": "none", "acodec": "opus", "filesize": 1 * MB},
+        {"format_id": "video-only", "vcodec": "vp9", "acodec": "none", "filesize": 30 * MB},
+        {"format_id": "complete", "vcodec": "h264", "acodec": "aac", "filesize": 80 * MB},
+    ]
+    assert select(formats) == "video-only"
+
+
+def test_nothing_fits():
+    formats = [
+        {"format_id": "audio", "vcodec": "none", "acodec": "opus", "filesize": 1 * MB},
+        {"format_id": "big", "vcodec": "h264", "acodec": "aac", "filesize": 120 * MB},
+        {"format_id": "bigger", "vcodec": "h264", "acodec": "aac", "filesize": 200 * MB},
+    ]
+    with pytest.raises(FileTooLargeException, match="120 MB"):
+        select(formats)
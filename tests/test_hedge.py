@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from bot.downloaders.hedge import Hedge
+
+
+def strategy(name, delay, result):
+    async def run():
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return name, run
+
+
+def race(hedge, primary, secondary):
+    return asyncio.run(hedge.run(primary, secondary, ok=lambda r: r["success"]))
+
+
+def test_fast_primary_is_not_hedged():
+    hedge = Hedge(0.05)
+    winner, result = race(hedge, strategy("html", 0, {"success": True}), strategy("ytdlp", 0, {"success": True}))
+
+    assert winner == "html"
+    assert hedge.stats()["hedged"] == 0
+    assert hedge.stats()["strategies"]["html"]["wins"] == 1
+    assert "ytdlp" not in hedge.stats()["strategies"]
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedge = Hedge(0.01)
+    winner, _ = race(hedge, strategy("html", 1, {"success": True}), strategy("ytdlp", 0, {"success": True}))
+
+    stats = hedge.stats()
+    assert winner == "ytdlp"
+    assert stats["hedged"] == 1
+    assert stats["strategies"]["html"]["cancelled"] == 1
+
+
+def test_failed_primary_starts_the_secondary_at_once():
+    hedge = Hedge(10)
+    winner, _ = race(hedge, strategy("html", 0, {"success": False}), strategy("ytdlp", 0, {"success": True}))
+
+    assert winner == "ytdlp"
+    assert hedge.stats()["hedged"] == 0
+    assert hedge.stats()["strategies"]["html"]["failures"] == 1
+
+
+def test_both_failing_reports_the_secondary_failure():
+    hedge = Hedge(0)
+    winner, result = race(
+        hedge, strategy("html", 0, {"success": False, "n": 1}), strategy("ytdlp", 0, {"success": False, "n": 2}),
+    )
+
+    assert winner is None
+    assert result["n"] == 2
+
+
+def test_secondary_exception_is_raised_when_both_fail():
+    hedge = Hedge(0)
+    with pytest.raises(ValueError):
+        race(hedge, strategy("html", 0, {"success": False}), strategy("ytdlp", 0, ValueError("boom")))
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from benchmarks.bench_ig_extract import FIXTURES, soup_extract
+from bot.downloaders.ig_extract import InstagramPageExtractor, extract_page
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("chunk_size", [97, 4096, 16384])
+def test_carousel_page(chunk_size):
+    page = load("instagram_carousel.html")
+    extractor = extract_page(page, chunk_size)
+
+    assert extractor.author == "Sekar Ayu (@sekar.ayu)"
+    assert extractor.caption == "Liburan ke Bromo bareng kanca-kanca ☀️ #bromo #jawatimur & #travel"
+    media = extractor.media_urls()
+    assert len(media) == 6
+    # slide order is kept
+    assert [url.split("/")[-1].split("_")[0] for url in media] == [f"40000000{i}" for i in range(1, 7)]
+    assert all("&_nc_ht=" in url and "\\" not in url for url in media)
+
+
+def test_carousel_page_stops_early():
+    page = load("instagram_carousel.html")
+    extractor = extract_page(page)
+
+    assert extractor.done
+    assert extractor.chars_read < len(page) / 2
+
+
+@pytest.mark.parametrize("chunk_size", [97, 16384])
+def test_single_page(chunk_size):
+    page = load("instagram_single.html")
+    extractor = extract_page(page, chunk_size)
+
+    assert extractor.author == "Bayu Pratama (@bayu.pr)"
+    assert extractor.caption == "Kopi sore nang Malioboro"
+    assert len(extractor.media_urls()) == 1
+    # no carousel data: the whole page has to be read
+    assert extractor.chars_read == len(page)
+
+
+@pytest.mark.parametrize("name", ["instagram_carousel.html", "instagram_single.html"])
+def test_matches_the_beautifulsoup_parse(name):
+    page = load(name)
+    old = soup_extract(page)
+    new = extract_page(page)
+
+    assert new.author == old["author"]
+    assert set(new.media_urls()) == set(old["media"])
+
+
+def test_json_ld_fills_missing_fields():
+    page = (
+        '<html><head><script type="application/ld+json">'
+        '{"image": [{"url": "https://cdn.example/a.jpg"}, "https://cdn.example/b.jpg"],'
+        ' "author": {"name": "someone"}, "articleBody": "from ld+json"}'
+        '</script></head></html>'
+    )
+    extractor = extract_page(page, 10)
+
+    assert extractor.author == "someone"
+    assert extractor.caption == "from ld+json"
+    assert extractor.media_urls() == ["https://cdn.example/a.jpg", "https://cdn.example/b.jpg"]
+
+
+def test_max_chars_bounds_reading():
+    extractor = InstagramPageExtractor(max_chars=1000)
+    assert not extractor.feed("x" * 999)
+    assert extractor.feed("x")
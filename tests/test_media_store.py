@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from bot.media_store import MediaStore, MemoryMedia
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MediaStore(max_bytes=10_000, high_watermark=0.9, low_watermark=0.5, memory_threshold=0)
+    store.register_dir(str(tmp_path))
+    return store
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_release_keeps_file_until_last_holder(store, tmp_path):
+    path = write(tmp_path, "a.mp4", b"x" * 100)
+    store.track(path)
+    store.track(path)
+
+    store.release(path)
+    assert os.path.exists(path)
+    assert store.usage == 100
+
+    store.release(path)
+    assert not os.path.exists(path)
+    assert store.usage == 0
+
+
+def test_sweep_leaves_fresh_untracked_files_alone(store, tmp_path):
+    path = write(tmp_path, "fresh.mp4", b"x" * 100)
+    # yt-dlp backdates mtime to Last-Modified, the grace goes by ctime
+    os.utime(path, (time.time() - 600, time.time() - 600))
+
+    store.sweep()
+    assert store.usage == 0
+
+    store.adopt_grace = 0
+    store.sweep()
+    assert store.usage == 100
+
+
+def test_evicts_least_recently_used_unpinned_files(tmp_path):
+    store = MediaStore(max_bytes=10_000, high_watermark=0.9, low_watermark=0.7, memory_threshold=0)
+    store.register_dir(str(tmp_path))
+    old = store.track(write(tmp_path, "old.mp4", b"a" * 3000), pin=False)
+    recent = store.track(write(tmp_path, "recent.mp4", b"b" * 3000), pin=False)
+    store.track(old, pin=False)  # used again, now the most recent
+
+    sending = store.track(write(tmp_path, "sending.mp4", b"c" * 3500))
+
+    assert os.path.exists(old)
+    assert not os.path.exists(recent)
+    assert os.path.exists(sending)
+    assert store.usage == 6500
+    assert store.stats()["evicted"] == 1
+
+
+def test_pinned_files_are_never_evicted(store, tmp_path):
+    first = store.track(write(tmp_path, "first.mp4", b"a" * 6000))
+    second = store.track(write(tmp_path, "second.mp4", b"b" * 6000))
+
+    assert os.path.exists(first) and os.path.exists(second)
+    assert store.usage == 12_000
+    assert store.stats()["evicted"] == 0
+
+
+def test_duplicate_content_is_linked_and_counted_once(store, tmp_path):
+    first = store.track(write(tmp_path, "first.mp4", b"x" * 1000))
+    repost = store.track(write(tmp_path, "repost.mp4", b"x" * 1000))
+
+    assert os.stat(first).st_ino == os.stat(repost).st_ino
+    assert store.usage == 1000
+    assert store.digest(first) == store.digest(repost) is not None
+    assert store.stats()["deduped"] == 1
+
+    store.release(first)
+    assert os.path.exists(repost)
+    assert store.usage == 1000
+
+    store.release(repost)
+    assert store.usage == 0
+
+
+def test_different_content_is_not_linked(store, tmp_path):
+    first = store.track(write(tmp_path, "first.mp4", b"x" * 1000))
+    other = store.track(write(tmp_path, "other.mp4", b"y" * 1000))
+
+    assert os.stat(first).st_ino != os.stat(other).st_ino
+    assert store.usage == 2000
+    assert store.digest(first) != store.digest(other)
+
+
+def test_keep_dedups_spilled_media(store, tmp_path):
+    first = asyncio.run(store.keep(b"z" * 500, str(tmp_path / "a.jpg")))
+    second = asyncio.run(store.keep(b"z" * 500, str(tmp_path / "b.jpg")))
+
+    assert os.stat(first).st_ino == os.stat(second).st_ino
+    assert store.usage == 500
+
+
+def test_memory_media_digest_matches_file_digest(tmp_path):
+    store = MediaStore(memory_threshold=1000)
+    store.register_dir(str(tmp_path))
+    small = asyncio.run(store.keep(b"q" * 100, str(tmp_path / "small.jpg")))
+    on_disk = store.track(write(tmp_path, "same.jpg", b"q" * 100))
+
+    assert isinstance(small, MemoryMedia)
+    assert store.digest(small) == store.digest(on_disk)
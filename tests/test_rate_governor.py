@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from bot import rate_governor
+from bot.rate_governor import RateGovernor, RateLimitedException, TokenBucket, parse_limits
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_governor.time, "monotonic", clock)
+    return clock
+
+
+def test_parse_limits():
+    assert parse_limits("tiktok:metadata=60/10, instagram:media=120,junk") == {
+        "tiktok:metadata": (60.0, 10.0),
+        "instagram:media": (120.0, 20.0),
+    }
+
+
+def test_burst_then_paced_in_arrival_order(clock):
+    bucket = TokenBucket("ig", per_minute=60, burst=2)
+
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(10) == pytest.approx(1)
+    assert bucket.reserve(10) == pytest.approx(2)
+
+    clock.now += 3
+    assert bucket.reserve(10) == 0
+
+
+def test_reservation_beyond_max_wait_is_refused_for_free(clock):
+    bucket = TokenBucket("ig", per_minute=60, burst=1)
+    bucket.reserve(10)
+
+    assert bucket.reserve(0.5) is None
+    assert bucket.reserve(10) == pytest.approx(1)
+    assert bucket.stats()["refused"] == 1
+
+
+def test_throttle_halves_the_rate_and_success_recovers_it(clock):
+    bucket = TokenBucket("ig", per_minute=60, burst=5, min_fraction=0.25, recovery=0.25)
+
+    bucket.throttled()
+    assert bucket.stats()["per_minute"] == pytest.approx(30)
+    # saved burst is dropped
+    assert bucket.reserve(10) == pytest.approx(2)
+
+    bucket.throttled()
+    bucket.throttled()
+    assert bucket.stats()["per_minute"] == pytest.approx(15)
+
+    for _ in range(10):
+        bucket.ok()
+    assert bucket.stats()["per_minute"] == pytest.approx(60)
+
+
+def test_governor_refuses_with_a_user_message(clock):
+    governor = RateGovernor({"instagram:metadata": (60, 1)}, max_wait=0.5)
+
+    async def main():
+        await governor.acquire("instagram:metadata")
+        await governor.acquire("instagram:metadata")
+
+    with pytest.raises(RateLimitedException, match="Instagram"):
+        asyncio.run(main())
+
+
+def test_unconfigured_endpoints_are_not_paced():
+    governor = RateGovernor({"tiktok:media": (0, 0)}, max_wait=0)
+
+    async def main():
+        for _ in range(100):
+            await governor.acquire("tiktok:media")
+            await governor.acquire("somewhere:else")
+
+    asyncio.run(main())
+    assert "tiktok:media" not in governor.stats()
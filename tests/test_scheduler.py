@@ -0,0 +1,133 @@
+import asyncio
+
+from bot.scheduler import DownloadScheduler
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def run_queue(scheduler, jobs):
+    """Hold the only slot, queue ``jobs`` as (tier, user, tag), then let them run in turn"""
+    started = []
+
+    async def main():
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(scheduler.run("free", 0, gate.wait))
+        await settle()
+
+        async def job(tag):
+            started.append(tag)
+
+        tasks = [
+            asyncio.create_task(scheduler.run(tier, user, lambda tag=tag: job(tag)))
+            for tier, user, tag in jobs
+        ]
+        await settle()
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    return started
+
+
+def test_tiers_are_served_in_proportion_to_their_weights():
+    scheduler = DownloadScheduler(max_active=1, weights={"vip": 3, "free": 1})
+    jobs = [("free", 100 + i, f"free{i}") for i in range(4)]
+    jobs += [("vip", 200 + i, f"vip{i}") for i in range(6)]
+
+    started = run_queue(scheduler, jobs)
+
+    assert [tag[:3] for tag in started[:8]].count("vip") == 6
+    assert started.index("vip5") < started.index("free2")
+
+
+def test_users_in_a_lane_take_turns():
+    scheduler = DownloadScheduler(max_active=1)
+    jobs = [("free", 1, f"a{i}") for i in range(3)] + [("free", 2, "b0"), ("free", 2, "b1")]
+
+    assert run_queue(scheduler, jobs) == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_per_user_cap_limits_concurrency():
+    scheduler = DownloadScheduler(max_active=4, per_user_active=2)
+    running = peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    async def main():
+        await asyncio.gather(*(scheduler.run("free", 1, job) for _ in range(5)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.active == 0
+
+
+def test_waiting_jobs_learn_their_position():
+    scheduler = DownloadScheduler(max_active=1, notify_interval=0)
+    positions = {}
+
+    async def main():
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(scheduler.run("free", 0, gate.wait))
+        await settle()
+
+        async def report(tag, position):
+            positions.setdefault(tag, []).append(position)
+
+        async def job():
+            await settle()
+
+        tasks = [
+            asyncio.create_task(scheduler.run(
+                "free", user, job, lambda p, tag=f"u{user}": report(tag, p),
+            ))
+            for user in (1, 2, 3)
+        ]
+        await settle()
+        assert {tag: seen[-1] for tag, seen in positions.items()} == {"u1": 1, "u2": 2, "u3": 3}
+
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    assert positions["u1"] == [1, 0]
+    assert positions["u2"] == [2, 1, 0]
+    assert positions["u3"] == [3, 2, 1, 0]
+
+
+def test_cancelled_job_leaves_the_queue():
+    scheduler = DownloadScheduler(max_active=1, notify_interval=0)
+    positions = []
+
+    async def main():
+        gate = asyncio.Event()
+        blocker = asyncio.create_task(scheduler.run("free", 0, gate.wait))
+        await settle()
+        leaving = asyncio.create_task(scheduler.run("free", 1, gate.wait))
+        await settle()
+
+        async def report(position):
+            positions.append(position)
+
+        staying = asyncio.create_task(scheduler.run("free", 2, settle, report))
+        await settle()
+        assert scheduler.queued == 2
+
+        leaving.cancel()
+        await settle()
+        assert scheduler.queued == 1
+        assert positions == [2, 1]
+
+        gate.set()
+        await asyncio.gather(blocker, staying)
+
+    asyncio.run(main())
+    assert positions[-1] == 0
+    assert scheduler.stats()["active"] == 0
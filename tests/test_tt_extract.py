@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from bot.downloaders.tt_extract import TikTokPageExtractor
+
+
+def photo_item(video_id="7300000000000000001"):
+    return {
+        "id": video_id,
+        "desc": "Sunset nang Parangtritis",
+        "author": {"uniqueId": "dimas.w"},
+        "imagePost": {
+            "title": "photo title",
+            "images": [
+                {"imageURL": {"urlList": ["https://p16.example/1.webp", "https://p16.example/1.jpeg"]}},
+                {"imageURL": {"urlList": ["https://p16.example/2.heic"]}},
+                {"imageURL": {"urlList": []}},
+            ],
+        },
+    }
+
+
+def page(state, script_id="__UNIVERSAL_DATA_FOR_REHYDRATION__"):
+    return (
+        "<html><head>" + "<meta name=x>" * 200
+        + f'<script id="{script_id}" type="application/json">{json.dumps(state)}</script>'
+        + "<body>" + "x" * 50_000 + "</body></html>"
+    )
+
+
+def feed(html, chunk_size):
+    extractor = TikTokPageExtractor()
+    for i in range(0, len(html), chunk_size):
+        if extractor.feed(html[i:i + chunk_size]):
+            break
+    return extractor
+
+
+@pytest.mark.parametrize("chunk_size", [7, 512, 4096])
+def test_universal_data_slideshow(chunk_size):
+    state = {"__DEFAULT_SCOPE__": {"webapp.video-detail": {"itemInfo": {"itemStruct": photo_item()}}}}
+    html = page(state)
+    extractor = feed(html, chunk_size)
+
+    assert extractor.slideshow() == {
+        "images": ["https://p16.example/1.jpeg", "https://p16.example/2.heic"],
+        "author": "dimas.w",
+        "caption": "Sunset nang Parangtritis",
+    }
+    # reading stops once the state script has closed
+    assert extractor.chars_read < len(html) - 40_000
+
+
+def test_sigi_state_picks_the_requested_item():
+    other = dict(photo_item("1"), desc="other post")
+    state = {"ItemModule": {"1": other, "2": photo_item("2")}}
+    extractor = feed(page(state, "SIGI_STATE"), 1024)
+
+    assert extractor.slideshow("2")["caption"] == "Sunset nang Parangtritis"
+    assert extractor.slideshow("missing")["caption"] == "other post"
+
+
+def test_video_post_is_not_a_slideshow():
+    item = {"id": "3", "desc": "a video", "video": {"playAddr": "https://v.example/3.mp4"}}
+    state = {"__DEFAULT_SCOPE__": {"webapp.video-detail": {"itemInfo": {"itemStruct": item}}}}
+
+    assert feed(page(state), 4096).slideshow() is None
+
+
+def test_broken_state_json_stops_reading():
+    html = '<script id="SIGI_STATE">{"ItemModule": </script>' + "x" * 10_000
+    extractor = feed(html, 16)
+
+    assert extractor.done
+    assert extractor.slideshow() is None
+
+
+def test_page_without_state_is_read_up_to_max_chars():
+    extractor = TikTokPageExtractor(max_chars=5000)
+    for _ in range(4):
+        assert not extractor.feed("<div>" * 200)
+    assert extractor.feed("<div>" * 200)
+    assert extractor.item() is None